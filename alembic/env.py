@@ -18,16 +18,29 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
+from app.config import settings
 from app.database import Base
+from app.partitions import is_partition
 
 target_metadata = Base.metadata
 
+config.set_main_option(
+    "sqlalchemy.url", settings.database_url.replace("+asyncpg", "+psycopg2")
+)
+# migrations that bucket by term read the configured months from here
+config.attributes.setdefault("term_start_months", settings.term_start_months)
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # partitions are created at runtime and are not part of the models
+    return not (type_ == "table" and is_partition(name))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -66,7 +79,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
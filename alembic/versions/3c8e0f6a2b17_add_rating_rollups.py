@@ -0,0 +1,75 @@
+"""add rating rollups
+
+Revision ID: 3c8e0f6a2b17
+Revises: e5a7c1d9f204
+Create Date: 2026-10-18 09:41:05.532870
+
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3c8e0f6a2b17"
+down_revision = "e5a7c1d9f204"
+branch_labels = None
+depends_on = None
+
+YEAR = "extract(year FROM created_at)::int"
+MONTH = "extract(month FROM created_at)"
+
+
+def _buckets(term_start_months: list[int]) -> dict[str, str]:
+    """SQL bucket expressions by period, as history.bucket_sql built them at
+    this revision."""
+    months = sorted(int(month) for month in term_start_months)
+    terms = " ".join(
+        f"WHEN {MONTH} >= {month} THEN make_date({YEAR}, {month}, 1)"
+        for month in reversed(months)
+    )
+    return {
+        "day": "date_trunc('day', created_at)::date",
+        "week": "date_trunc('week', created_at)::date",
+        "term": f"CASE {terms} ELSE make_date({YEAR} - 1, {months[-1]}, 1) END",
+    }
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rating_rollups",
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "score_type",
+            postgresql.ENUM(name="scoretypeenum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "period",
+            sa.Enum("day", "week", "term", name="rollupperiod"),
+            nullable=False,
+        ),
+        sa.Column("bucket", sa.Date(), nullable=False),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("entries", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["student_id"],
+            ["students.id"],
+        ),
+        sa.PrimaryKeyConstraint("student_id", "score_type", "period", "bucket"),
+    )
+    # the configured term_start_months, passed in by env.py
+    months = context.config.attributes.get("term_start_months", [1, 9])
+    for period, bucket in _buckets(months).items():
+        op.execute(
+            "INSERT INTO rating_rollups"
+            " (student_id, score_type, period, bucket, total, entries)"
+            f" SELECT student_id, score_type, '{period}', {bucket},"
+            " sum(amount), count(*)"
+            " FROM score_entries GROUP BY student_id, score_type, 4"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("rating_rollups")
+    sa.Enum(name="rollupperiod").drop(op.get_bind())
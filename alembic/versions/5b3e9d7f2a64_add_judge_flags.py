@@ -0,0 +1,62 @@
+"""add judge flags and watermarks
+
+Revision ID: 5b3e9d7f2a64
+Revises: 8f2d4b6a1c95
+Create Date: 2026-10-18 12:16:38.204719
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5b3e9d7f2a64"
+down_revision = "8f2d4b6a1c95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "judge_flags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum("self_judging", "reciprocal", "burst", name="flagkind"),
+            nullable=False,
+        ),
+        sa.Column("judge_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=True),
+        sa.Column("score_entry_id", sa.Integer(), nullable=False),
+        sa.Column("entries", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["judge_id"],
+            ["students.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["student_id"],
+            ["students.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_judge_flags_judge_id_created_at",
+        "judge_flags",
+        ["judge_id", "created_at"],
+    )
+    op.create_table(
+        "watermarks",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("watermarks")
+    op.drop_index("ix_judge_flags_judge_id_created_at", table_name="judge_flags")
+    op.drop_table("judge_flags")
+    sa.Enum(name="flagkind").drop(op.get_bind())
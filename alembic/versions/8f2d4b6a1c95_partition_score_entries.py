@@ -0,0 +1,105 @@
+"""partition score_entries by month
+
+Revision ID: 8f2d4b6a1c95
+Revises: 3c8e0f6a2b17
+Create Date: 2026-10-18 11:02:47.118305
+
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8f2d4b6a1c95"
+down_revision = "3c8e0f6a2b17"
+branch_labels = None
+depends_on = None
+
+# months created past the current one; later ones come from
+# `python -m app.commands partitions`
+AHEAD = 3
+
+_indexes = {
+    "ix_score_entries_student_id_score_type_created_at": [
+        "student_id",
+        "score_type",
+        "created_at",
+    ],
+    "ix_score_entries_judge_id_created_at": ["judge_id", "created_at"],
+    "ix_score_entries_lesson_id_student_id": ["lesson_id", "student_id"],
+}
+_foreign_keys = {
+    "score_entries_student_id_fkey": ("students", "student_id"),
+    "score_entries_judge_id_fkey": ("students", "judge_id"),
+    "score_entries_lesson_id_fkey": ("lessons", "lesson_id"),
+    "score_entries_event_id_fkey": ("events", "event_id"),
+}
+
+
+def _add_months(month: date, count: int) -> date:
+    year, index = divmod(month.year * 12 + month.month - 1 + count, 12)
+    return date(year, index + 1, 1)
+
+
+def _create_partition(month: date):
+    end = _add_months(month, 1)
+    op.execute(
+        f"CREATE TABLE score_entries_y{month.year}m{month.month:02d}"
+        f" PARTITION OF score_entries FOR VALUES FROM ('{month}') TO ('{end}')"
+    )
+
+
+def _detach_old_table(old: str):
+    op.rename_table("score_entries", old)
+    # index names are schema-wide, free them for the new table
+    op.drop_constraint("score_entries_pkey", old)
+    for name in _indexes:
+        op.drop_index(name, table_name=old)
+
+
+def _create_keys(primary_key: list[str]):
+    op.create_primary_key("score_entries_pkey", "score_entries", primary_key)
+    for name, (table, column) in _foreign_keys.items():
+        op.create_foreign_key(name, "score_entries", table, [column], ["id"])
+    for name, columns in _indexes.items():
+        op.create_index(name, "score_entries", columns)
+
+
+def _move_rows(old: str):
+    op.execute(f"INSERT INTO score_entries SELECT * FROM {old}")
+    # the id sequence is owned by the old table and would be dropped with it
+    op.execute("ALTER SEQUENCE score_entries_id_seq OWNED BY score_entries.id")
+    op.drop_table(old)
+
+
+def upgrade() -> None:
+    _detach_old_table("score_entries_unpartitioned")
+    op.execute(
+        "CREATE TABLE score_entries (LIKE score_entries_unpartitioned"
+        " INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    )
+    _create_keys(["id", "created_at"])
+
+    op.execute("CREATE TABLE score_entries_default PARTITION OF score_entries DEFAULT")
+    first = op.get_bind().scalar(
+        sa.text("SELECT min(created_at) FROM score_entries_unpartitioned")
+    )
+    month = (first.date() if first else date.today()).replace(day=1)
+    last = _add_months(date.today().replace(day=1), AHEAD)
+    while month <= last:
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    _move_rows("score_entries_unpartitioned")
+
+
+def downgrade() -> None:
+    _detach_old_table("score_entries_partitioned")
+    op.execute(
+        "CREATE TABLE score_entries (LIKE score_entries_partitioned"
+        " INCLUDING DEFAULTS)"
+    )
+    _create_keys(["id"])
+    _move_rows("score_entries_partitioned")
@@ -0,0 +1,45 @@
+"""add student ratings
+
+Revision ID: b41f2c9e8d03
+Revises: 7d9a3ecea88e
+Create Date: 2026-10-18 08:30:12.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "b41f2c9e8d03"
+down_revision = "7d9a3ecea88e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "student_ratings",
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "score_type",
+            postgresql.ENUM(name="scoretypeenum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("entries", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["student_id"],
+            ["students.id"],
+        ),
+        sa.PrimaryKeyConstraint("student_id", "score_type"),
+    )
+    op.execute(
+        "INSERT INTO student_ratings (student_id, score_type, total, entries) "
+        "SELECT student_id, score_type, sum(amount), count(*) FROM score_entries "
+        "GROUP BY student_id, score_type"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("student_ratings")
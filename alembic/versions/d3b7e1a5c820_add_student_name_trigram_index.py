@@ -0,0 +1,32 @@
+"""add student name trigram index
+
+Revision ID: d3b7e1a5c820
+Revises: a6c4f0e2d918
+Create Date: 2026-10-18 13:48:26.318402
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d3b7e1a5c820"
+down_revision = "a6c4f0e2d918"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block; the
+    # expression must match app.search.name for the planner to use the index
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_name_trgm"
+            " ON students USING gin"
+            " (lower(firstname || ' ' || lastname) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_students_name_trgm")
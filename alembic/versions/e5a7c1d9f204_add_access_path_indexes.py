@@ -0,0 +1,61 @@
+"""add access path indexes
+
+Revision ID: e5a7c1d9f204
+Revises: b41f2c9e8d03
+Create Date: 2026-10-18 09:02:47.120934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e5a7c1d9f204"
+down_revision = "b41f2c9e8d03"
+branch_labels = None
+depends_on = None
+
+indexes = [
+    (
+        "ix_score_entries_student_id_score_type_created_at",
+        "score_entries",
+        ["student_id", "score_type", "created_at"],
+    ),
+    (
+        "ix_score_entries_judge_id_created_at",
+        "score_entries",
+        ["judge_id", "created_at"],
+    ),
+    (
+        "ix_score_entries_lesson_id_student_id",
+        "score_entries",
+        ["lesson_id", "student_id"],
+    ),
+    (
+        "ix_students_to_groups_student_id_group_id",
+        "students_to_groups",
+        ["student_id", "group_id"],
+    ),
+    ("ix_lessons_group_id_starts_at", "lessons", ["group_id", "starts_at"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(indexes):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
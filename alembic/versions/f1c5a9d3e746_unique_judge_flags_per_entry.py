@@ -0,0 +1,28 @@
+"""unique judge flags per entry
+
+Revision ID: f1c5a9d3e746
+Revises: d3b7e1a5c820
+Create Date: 2026-10-18 16:02:51.447310
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f1c5a9d3e746"
+down_revision = "d3b7e1a5c820"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_judge_flags_score_entry_id_kind",
+        "judge_flags",
+        ["score_entry_id", "kind"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_judge_flags_score_entry_id_kind", table_name="judge_flags")
@@ -0,0 +1,417 @@
+import asyncio
+from datetime import date, datetime, timezone
+import io
+import time
+
+import numpy as np
+import sqlalchemy as sql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import (
+    Event,
+    ScoreEntry,
+    read_session_factory,
+    students_groups_association,
+)
+from .periodic import Periodic
+from .schemas import (
+    EventUptake,
+    JudgeBias,
+    ScoreTypeEnum,
+    ScoreTypePercentiles,
+    StudentZScore,
+)
+
+SCORE_TYPES = list(ScoreTypeEnum)
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+_dtypes = {
+    "id": np.int32,
+    "student_id": np.int32,
+    "judge_id": np.int32,
+    "lesson_id": np.int32,
+    "event_id": np.int32,  # -1 when the entry has no event
+    "score_type": np.int16,  # index into SCORE_TYPES
+    "amount": np.int32,
+    "created_at": np.int64,  # microseconds since the epoch
+}
+_row_dtype = np.dtype(list(_dtypes.items()))
+# every column as an integer, so batches arrive as plain CSV numbers
+_entry_columns = (
+    ScoreEntry.id,
+    ScoreEntry.student_id,
+    ScoreEntry.judge_id,
+    ScoreEntry.lesson_id,
+    sql.func.coalesce(ScoreEntry.event_id, -1),
+    sql.case(
+        {score_type.name: code for code, score_type in enumerate(SCORE_TYPES)},
+        value=sql.cast(ScoreEntry.score_type, sql.String),
+    ),
+    ScoreEntry.amount,
+    sql.cast(
+        sql.func.date_part("epoch", ScoreEntry.created_at) * 1_000_000, sql.BigInteger
+    ),
+)
+
+
+def _micros(day: date) -> int:
+    moment = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return int(moment.timestamp()) * 1_000_000
+
+
+def _group_sums(keys: np.ndarray, values: np.ndarray):
+    """Unique `keys` with the count and sum of `values` per key."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (
+        unique,
+        np.bincount(inverse, minlength=unique.size),
+        np.bincount(inverse, weights=values, minlength=unique.size),
+    )
+
+
+class Snapshot:
+    """Columnar copy of `score_entries` for term-level statistics.
+
+    New entries are appended by id watermark. Ids skipped on the way, taken by
+    transactions still open at the time, are looked up again for
+    `analytics_gap_timeout` seconds; updates and deletes of already loaded
+    entries only show up after the next full reload.
+
+    After the first load, refreshes and reloads run in a background task and
+    swap in what they loaded once done, so requests never wait on them.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._clear()
+        self._refresher = Periodic(
+            self._refresh, lambda: settings.analytics_refresh_interval
+        )
+
+    def _clear(self):
+        self.columns = {name: np.empty(0, dtype) for name, dtype in _dtypes.items()}
+        self.watermark = 0
+        # (when seen, ids) skipped below the watermark, by transactions that
+        # may still commit
+        self._gaps: list[tuple[float, np.ndarray]] = []
+        self.event_ids = np.empty(0, np.int32)
+        self.event_base_amounts = np.empty(0, np.float64)  # NaN without base_amount
+        self.member_groups = np.empty(0, np.int32)
+        self.member_students = np.empty(0, np.int32)
+        self._refreshed_at = self._reloaded_at = float("-inf")
+
+    def __len__(self):
+        return self.columns["id"].size
+
+    def _take(self, other: "Snapshot"):
+        for name in (
+            "columns",
+            "watermark",
+            "_gaps",
+            "event_ids",
+            "event_base_amounts",
+            "member_groups",
+            "member_students",
+        ):
+            setattr(self, name, getattr(other, name))
+
+    async def ready(self):
+        """Load on first use, and keep refreshing in the background from then on."""
+        if not self._refresher.running:
+            await self._refresh()
+            if not self._refresher.running:
+                self._refresher.start()
+
+    async def stop(self):
+        await self._refresher.stop()
+
+    async def _refresh(self):
+        async with read_session_factory() as db:
+            await self.refresh(db)
+
+    async def refresh(self, db: AsyncSession, force: bool = False):
+        async with self._lock:
+            now = time.monotonic()
+            reload = now - self._reloaded_at >= settings.analytics_reload_interval
+            if not (reload or force) and (
+                now - self._refreshed_at < settings.analytics_refresh_interval
+            ):
+                return
+            # a reload is built aside; readers keep the old copy until it is done
+            target = Snapshot() if reload else self
+            await target._load_entries(db)
+            await target._load_events_and_members(db)
+            if reload:
+                self._take(target)
+                self._reloaded_at = now
+            self._refreshed_at = now
+
+    async def _load_entries(self, db: AsyncSession):
+        columns = {name: [column] for name, column in self.columns.items()}
+        gaps = await self._load_gaps(db, columns)
+
+        # COPY straight into a buffer: ORM rows cost more than the whole
+        # numpy side, and the columns are all integers anyway
+        conn = await db.connection()
+        raw = (await conn.get_raw_connection()).driver_connection
+        watermark = self.watermark
+        while True:
+            query = (
+                sql.select(*_entry_columns)
+                .where(ScoreEntry.id > watermark)
+                .order_by(ScoreEntry.id)
+                .limit(settings.analytics_batch_size)
+            )
+            buffer = io.BytesIO()
+            await raw.copy_from_query(
+                str(
+                    query.compile(
+                        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                ),
+                output=buffer,
+                format="csv",
+            )
+            if not buffer.tell():
+                break
+            buffer.seek(0)
+            # parsed into the final column types, then split up right away so
+            # only one batch is ever held as rows
+            batch = await asyncio.to_thread(
+                np.loadtxt, buffer, _row_dtype, delimiter=",", ndmin=1
+            )
+            for name in _dtypes:
+                columns[name].append(batch[name].copy())
+            ids = columns["id"][-1]
+            gaps.append(
+                (
+                    time.monotonic(),
+                    np.setdiff1d(
+                        np.arange(watermark + 1, ids[-1], dtype=ids.dtype),
+                        ids,
+                        assume_unique=True,
+                    ),
+                )
+            )
+            watermark = int(ids[-1])
+
+        if len(columns["id"]) > 1:
+            self.columns = await asyncio.to_thread(
+                lambda: {name: np.concatenate(parts) for name, parts in columns.items()}
+            )
+        self.watermark = watermark
+        self._gaps = [(seen, ids) for seen, ids in gaps if ids.size]
+
+    async def _load_gaps(
+        self, db: AsyncSession, columns: dict[str, list[np.ndarray]]
+    ) -> list[tuple[float, np.ndarray]]:
+        """Append the entries that have since committed into gaps below the
+        watermark; returns the gaps still open."""
+        now = time.monotonic()
+        gaps = [
+            (seen, ids)
+            for seen, ids in self._gaps
+            if now - seen < settings.analytics_gap_timeout
+        ]
+        if not gaps:
+            return gaps
+        wanted = np.concatenate([ids for _, ids in gaps]).tolist()
+        rows = (
+            await db.execute(
+                sql.select(*_entry_columns).where(
+                    ScoreEntry.id
+                    == sql.any_(
+                        sql.bindparam(
+                            "gaps", wanted, type_=postgresql.ARRAY(sql.Integer)
+                        )
+                    )
+                )
+            )
+        ).all()
+        if not rows:
+            return gaps
+        found = np.array(rows, np.int64)
+        for index, (name, dtype) in enumerate(_dtypes.items()):
+            columns[name].append(found[:, index].astype(dtype))
+        return [
+            (seen, np.setdiff1d(ids, found[:, 0], assume_unique=True))
+            for seen, ids in gaps
+        ]
+
+    async def _load_events_and_members(self, db: AsyncSession):
+        events = np.array(
+            (
+                await db.execute(
+                    sql.select(Event.id, Event.base_amount).order_by(Event.id)
+                )
+            ).all(),
+            np.float64,
+        ).reshape(-1, 2)
+        self.event_ids = events[:, 0].astype(np.int32)
+        self.event_base_amounts = events[:, 1]
+
+        members = np.array(
+            (await db.execute(sql.select(students_groups_association))).all(),
+            np.int32,
+        ).reshape(-1, 2)
+        self.member_groups, self.member_students = members[:, 0], members[:, 1]
+
+    def _mask(self, since: date | None, until: date | None) -> np.ndarray:
+        created_at = self.columns["created_at"]
+        mask = np.ones(created_at.size, bool)
+        if since is not None:
+            mask &= created_at >= _micros(since)
+        if until is not None:
+            mask &= created_at < _micros(until)
+        return mask
+
+    def percentiles(
+        self, since: date | None, until: date | None
+    ) -> list[ScoreTypePercentiles]:
+        """Percentiles of student totals per score type."""
+        mask = self._mask(since, until)
+        score_types = self.columns["score_type"][mask].astype(np.int64)
+        keys = self.columns["student_id"][mask] * len(SCORE_TYPES) + score_types
+        keys, _, totals = _group_sums(keys, self.columns["amount"][mask])
+        key_types = keys % len(SCORE_TYPES)
+
+        result = []
+        for code, score_type in enumerate(SCORE_TYPES):
+            values = totals[key_types == code]
+            if values.size == 0:
+                continue
+            result.append(
+                ScoreTypePercentiles(
+                    score_type=score_type,
+                    students=values.size,
+                    mean=values.mean(),
+                    percentiles=dict(
+                        zip(map(str, PERCENTILES), np.percentile(values, PERCENTILES))
+                    ),
+                )
+            )
+        return result
+
+    def group_zscores(
+        self,
+        group_id: int,
+        score_type: ScoreTypeEnum | None,
+        since: date | None,
+        until: date | None,
+    ) -> list[StudentZScore]:
+        """Every member's total as a z-score against the group's totals, the
+        member's own included."""
+        members = np.sort(self.member_students[self.member_groups == group_id])
+        if members.size == 0:
+            return []
+        mask = self._mask(since, until)
+        mask &= np.isin(self.columns["student_id"], members)
+        if score_type is not None:
+            mask &= self.columns["score_type"] == SCORE_TYPES.index(score_type)
+        totals = np.bincount(
+            np.searchsorted(members, self.columns["student_id"][mask]),
+            weights=self.columns["amount"][mask],
+            minlength=members.size,
+        )
+        std = totals.std()
+        z = (totals - totals.mean()) / std if std else np.zeros(members.size)
+        order = np.argsort(-z, kind="stable")
+        return [
+            StudentZScore(student_id=members[i], total=totals[i], z=z[i]) for i in order
+        ]
+
+    def judge_bias(
+        self, since: date | None, until: date | None, min_entries: int, limit: int
+    ) -> list[JudgeBias]:
+        """Mean amount per judge, and how far it sits from what other judges give
+        for the same score types; entries of a type no other judge gave are left
+        out of the comparison."""
+        mask = self._mask(since, until)
+        amount = self.columns["amount"][mask].astype(np.float64)
+        score_type = self.columns["score_type"][mask].astype(np.int64)
+        type_counts = np.bincount(score_type, minlength=len(SCORE_TYPES))
+        type_sums = np.bincount(score_type, weights=amount, minlength=len(SCORE_TYPES))
+
+        judges, judge_index = np.unique(
+            self.columns["judge_id"][mask], return_inverse=True
+        )
+        # per (judge, type): the judge's own share, taken out of the type's totals
+        pair = judge_index * len(SCORE_TYPES) + score_type
+        size = judges.size * len(SCORE_TYPES)
+        other_counts = type_counts[score_type] - np.bincount(pair, minlength=size)[pair]
+        other_sums = (
+            type_sums[score_type]
+            - np.bincount(pair, weights=amount, minlength=size)[pair]
+        )
+        compared = other_counts > 0
+        residual = np.where(
+            compared, amount - other_sums / np.maximum(other_counts, 1), 0
+        )
+
+        counts = np.bincount(judge_index, minlength=judges.size)
+        sums = np.bincount(judge_index, weights=amount, minlength=judges.size)
+        residuals = np.bincount(judge_index, weights=residual, minlength=judges.size)
+        compared = np.bincount(judge_index, weights=compared, minlength=judges.size)
+        keep = counts >= min_entries
+        judges, counts, sums, residuals, compared = (
+            judges[keep],
+            counts[keep],
+            sums[keep],
+            residuals[keep],
+            compared[keep],
+        )
+        bias = residuals / np.maximum(compared, 1)
+        order = np.argsort(-np.abs(bias), kind="stable")[:limit]
+        return [
+            JudgeBias(
+                judge_id=judges[i],
+                entries=counts[i],
+                mean_amount=sums[i] / counts[i],
+                bias=bias[i],
+            )
+            for i in order
+        ]
+
+    def event_uptake(
+        self, since: date | None, until: date | None, limit: int
+    ) -> list[EventUptake]:
+        """How often each event is awarded, to how many students, and how often at
+        its base_amount."""
+        mask = self._mask(since, until) & (self.columns["event_id"] >= 0)
+        event_id = self.columns["event_id"][mask]
+        amount = self.columns["amount"][mask]
+        events, inverse = np.unique(event_id, return_inverse=True)
+        base_amounts = np.full(events.size, np.nan)
+        known = np.isin(events, self.event_ids)
+        base_amounts[known] = self.event_base_amounts[
+            np.searchsorted(self.event_ids, events[known])
+        ]
+
+        counts = np.bincount(inverse, minlength=events.size)
+        sums = np.bincount(inverse, weights=amount, minlength=events.size)
+        at_base = np.bincount(
+            inverse, weights=amount == base_amounts[inverse], minlength=events.size
+        )
+        # distinct (event, student) pairs, counted per event
+        pairs = np.unique(
+            inverse.astype(np.int64) << 32 | self.columns["student_id"][mask]
+        )
+        students = np.bincount(pairs >> 32, minlength=events.size)
+
+        order = np.argsort(-counts, kind="stable")[:limit]
+        return [
+            EventUptake(
+                event_id=events[i],
+                base_amount=None if np.isnan(base_amounts[i]) else base_amounts[i],
+                entries=counts[i],
+                students=students[i],
+                mean_amount=sums[i] / counts[i],
+                at_base_share=at_base[i] / counts[i],
+            )
+            for i in order
+        ]
+
+
+snapshot = Snapshot()
@@ -0,0 +1,274 @@
+"""Judge abuse detection, off the request path.
+
+One consumer per deployment, chosen by a Postgres advisory lock, reads score
+entries past a persisted id watermark, feeds them through sliding windows and
+writes what it finds to `judge_flags`. Ids skipped on the way, taken by
+transactions still open at the time, hold the watermark back until they commit
+or `anomaly_gap_timeout` runs out; entries seen again after a restart do not
+flag twice.
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+import logging
+import time
+
+import asyncpg
+import sqlalchemy as sql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import ScoreEntry, judge_flags, session_factory, watermarks
+from .schemas import FlagKind
+
+log = logging.getLogger(__name__)
+
+WATERMARK = "judge_anomalies"
+_LOCK_KEY = 0x66746B01
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _pair(judge_id: int, student_id: int) -> int:
+    return judge_id << 32 | student_id
+
+
+class Detector:
+    """Sliding windows over entries in id order, bar the odd late commit; times
+    are epoch seconds."""
+
+    def __init__(
+        self, reciprocal_window: float, burst_window: float, burst_threshold: int
+    ):
+        self.reciprocal_window = reciprocal_window
+        self.burst_window = burst_window
+        self.burst_threshold = burst_threshold
+        # _pair(judge, student) -> when judge last scored student
+        self._scored: dict[int, float] = {}
+        # _pair(low, high) -> when the pair was last flagged as reciprocal
+        self._reciprocal: dict[int, float] = {}
+        self._recent: defaultdict[int, deque[float]] = defaultdict(deque)
+        self._burst_until: dict[int, float] = {}
+        self._latest = float("-inf")
+
+    def observe(
+        self, entry_id: int, judge_id: int, student_id: int, at: float
+    ) -> list[dict]:
+        flags = []
+
+        def flag(kind: FlagKind, entries: int, student: int | None = student_id):
+            flags.append(
+                {
+                    "kind": kind,
+                    "judge_id": judge_id,
+                    "student_id": student,
+                    "score_entry_id": entry_id,
+                    "entries": entries,
+                }
+            )
+
+        if judge_id == student_id:
+            flag(FlagKind.self_judging, 1)
+        else:
+            self._scored[_pair(judge_id, student_id)] = at
+            back = self._scored.get(_pair(student_id, judge_id))
+            pair = _pair(min(judge_id, student_id), max(judge_id, student_id))
+            if (
+                back is not None
+                and at - back <= self.reciprocal_window
+                and at - self._reciprocal.get(pair, float("-inf"))
+                > self.reciprocal_window
+            ):
+                self._reciprocal[pair] = at
+                flag(FlagKind.reciprocal, 2)
+
+        recent = self._recent[judge_id]
+        recent.append(at)
+        while recent[0] < at - self.burst_window:
+            recent.popleft()
+        if len(recent) > self.burst_threshold and at >= self._burst_until.get(
+            judge_id, float("-inf")
+        ):
+            # one flag per burst window, however long the burst goes on
+            self._burst_until[judge_id] = at + self.burst_window
+            flag(FlagKind.burst, len(recent), None)
+
+        self._latest = max(self._latest, at)
+        return flags
+
+    def evict(self):
+        """Forget everything that can no longer influence a flag."""
+        horizon = self._latest - self.reciprocal_window
+        self._scored = {k: t for k, t in self._scored.items() if t >= horizon}
+        self._reciprocal = {k: t for k, t in self._reciprocal.items() if t >= horizon}
+        horizon = self._latest - self.burst_window
+        for judge_id in [j for j, r in self._recent.items() if r[-1] < horizon]:
+            del self._recent[judge_id]
+        self._burst_until = {
+            j: t for j, t in self._burst_until.items() if t > self._latest
+        }
+
+
+def _entries(query: sql.Select) -> sql.Select:
+    return query.with_only_columns(
+        ScoreEntry.id,
+        ScoreEntry.judge_id,
+        ScoreEntry.student_id,
+        ScoreEntry.created_at,
+    ).order_by(ScoreEntry.id)
+
+
+def _observe(detector: Detector, rows) -> list[dict]:
+    return [
+        flag
+        for entry_id, judge_id, student_id, created_at in rows
+        for flag in detector.observe(
+            entry_id, judge_id, student_id, (created_at - _EPOCH).total_seconds()
+        )
+    ]
+
+
+async def _prime(db: AsyncSession, detector: Detector, watermark: int):
+    """Replay the entries before `watermark` that are still inside a window."""
+    last = (
+        await db.execute(
+            sql.select(ScoreEntry.created_at)
+            .where(ScoreEntry.id <= watermark)
+            .order_by(ScoreEntry.id.desc())
+            .limit(1)
+        )
+    ).scalar()
+    if last is None:
+        return
+    horizon = max(detector.reciprocal_window, detector.burst_window)
+    rows = await db.execute(
+        _entries(
+            sql.select(ScoreEntry).where(
+                ScoreEntry.id <= watermark,
+                ScoreEntry.created_at >= last - timedelta(seconds=horizon),
+            )
+        )
+    )
+    _observe(detector, rows)
+    detector.evict()
+
+
+async def _consume():
+    detector = Detector(
+        settings.anomaly_reciprocal_window,
+        settings.anomaly_burst_window,
+        settings.anomaly_burst_threshold,
+    )
+    async with session_factory() as db:
+        watermark = (
+            await db.execute(
+                sql.select(watermarks.c.value).where(watermarks.c.name == WATERMARK)
+            )
+        ).scalar() or 0
+        await _prime(db, detector, watermark)
+
+    # the newest id observed, and ids below it not seen yet, with when they
+    # were first missed
+    head, gaps = watermark, {}
+    while True:
+        now = time.monotonic()
+        gaps = {
+            entry_id: missed
+            for entry_id, missed in gaps.items()
+            if now - missed < settings.anomaly_gap_timeout
+        }
+        async with session_factory() as db, db.begin():
+            late = []
+            if gaps:
+                late = (
+                    await db.execute(
+                        _entries(sql.select(ScoreEntry)).where(
+                            ScoreEntry.id
+                            == sql.any_(
+                                sql.bindparam(
+                                    "gaps",
+                                    list(gaps),
+                                    type_=postgresql.ARRAY(sql.Integer),
+                                )
+                            )
+                        )
+                    )
+                ).all()
+            rows = (
+                await db.execute(
+                    _entries(sql.select(ScoreEntry))
+                    .where(ScoreEntry.id > head)
+                    .limit(settings.anomaly_batch_size)
+                )
+            ).all()
+            for row in late:
+                del gaps[row.id]
+            for row in rows:
+                gaps.update(dict.fromkeys(range(head + 1, row.id), now))
+                head = row.id
+            if late or rows:
+                flags = _observe(detector, [*late, *rows])
+                if flags:
+                    await db.execute(
+                        postgresql.insert(judge_flags).on_conflict_do_nothing(
+                            index_elements=[
+                                judge_flags.c.score_entry_id,
+                                judge_flags.c.kind,
+                            ]
+                        ),
+                        flags,
+                    )
+            # a restart resumes here, so it must not pass an open gap
+            safe = min(gaps) - 1 if gaps else head
+            if safe != watermark:
+                watermark = safe
+                stmt = postgresql.insert(watermarks).values(
+                    name=WATERMARK, value=watermark
+                )
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[watermarks.c.name],
+                        set_={"value": stmt.excluded.value},
+                    )
+                )
+        detector.evict()
+        if len(rows) < settings.anomaly_batch_size:
+            await asyncio.sleep(settings.anomaly_poll_interval)
+
+
+class Pipeline:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self):
+        while True:
+            try:
+                # the lock lives as long as this dedicated connection
+                conn = await asyncpg.connect(
+                    settings.database_url.replace("+asyncpg", "")
+                )
+                try:
+                    if await conn.fetchval(
+                        "SELECT pg_try_advisory_lock($1)", _LOCK_KEY
+                    ):
+                        await _consume()
+                finally:
+                    await conn.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("judge anomaly pipeline failed, restarting")
+            await asyncio.sleep(settings.anomaly_poll_interval)
+
+
+pipeline = Pipeline()
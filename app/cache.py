@@ -0,0 +1,119 @@
+from collections import OrderedDict, defaultdict
+import hashlib
+import time
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import on_commit
+from .routing import Route, wrap_route
+
+
+class Versions:
+    """Per-process counters bumped whenever the data behind a key changes."""
+
+    def __init__(self):
+        self._versions: dict[str, int] = defaultdict(int)
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: str):
+        for key in keys:
+            self._versions[key] += 1
+
+
+class ResponseCache:
+    """LRU of serialized response bodies bounded by total size and age."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._size = 0
+        self._entries: OrderedDict[str, tuple[str, bytes, str, float]] = OrderedDict()
+
+    def get(self, key: str, etag: str) -> tuple[bytes, str] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cached_etag, body, media_type, expires = entry
+        if cached_etag != etag or expires < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return body, media_type
+
+    def put(self, key: str, etag: str, body: bytes, media_type: str):
+        if len(body) > self.max_bytes or self.ttl <= 0:
+            return
+        self._remove(key)
+        self._entries[key] = (etag, body, media_type, time.monotonic() + self.ttl)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+versions = Versions()
+responses = ResponseCache(
+    max_bytes=settings.response_cache_max_bytes, ttl=settings.response_cache_ttl
+)
+
+
+def invalidate(db: AsyncSession, *keys: str):
+    on_commit(db, lambda: versions.bump(*keys))
+
+
+def _etag(request: Request, keys: tuple[str, ...]) -> str:
+    state = [str(request.url)]
+    state.extend(f"{key}={versions.get(key)}" for key in keys)
+    # other workers do not see our version bumps, so bound how long an ETag
+    # keeps validating by rolling it over every TTL period
+    state.append(str(int(time.time() // settings.response_cache_ttl)))
+    return (
+        'W/"'
+        + hashlib.blake2b("\n".join(state).encode(), digest_size=12).hexdigest()
+        + '"'
+    )
+
+
+def cached(*version_keys: str):
+    """Serve the endpoint with ETags and an in-process body cache.
+
+    `version_keys` name the data the response depends on and may use path
+    parameters, e.g. ``"group:{group_id}:members"``; writers call `invalidate`
+    with the same keys.
+    """
+
+    def wrapper(route: Route, handler):
+        if settings.response_cache_ttl <= 0:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            keys = tuple(key.format(**request.path_params) for key in version_keys)
+            etag = _etag(request, keys)
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+
+            cache_key = str(request.url)
+            hit = responses.get(cache_key, etag)
+            if hit is not None:
+                body, media_type = hit
+                return Response(body, media_type=media_type, headers={"ETag": etag})
+
+            response = await handler(request)
+            if response.status_code == status.HTTP_200_OK and hasattr(response, "body"):
+                responses.put(cache_key, etag, response.body, response.media_type)
+                response.headers["ETag"] = etag
+            return response
+
+        return cached_handler
+
+    return wrap_route(wrapper)
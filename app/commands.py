@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+from datetime import date
+
+from .database import session_factory
+from . import anomalies, idempotency, partitions, ratings
+
+
+async def rebuild_ratings(args: argparse.Namespace):
+    async with session_factory() as db, db.begin():
+        await ratings.rebuild(db)
+
+
+async def maintain_partitions(args: argparse.Namespace):
+    async with session_factory() as db, db.begin():
+        created, detached = await partitions.maintain(
+            db, date.today(), args.ahead, args.keep, args.archive_schema
+        )
+    for month in created:
+        print("created", partitions.partition_name(month))
+    for month in detached:
+        print(f"detached {partitions.partition_name(month)} into {args.archive_schema}")
+
+
+async def detect_anomalies(args: argparse.Namespace):
+    await anomalies.pipeline.run()
+
+
+async def prune_idempotency_keys(args: argparse.Namespace):
+    print("deleted", await idempotency.prune(), "expired idempotency keys")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "rebuild-ratings", help="recompute student rating totals from score entries"
+    ).set_defaults(handler=rebuild_ratings)
+
+    maintain = commands.add_parser(
+        "partitions",
+        help="create upcoming monthly score_entries partitions and ones for months"
+        " left in the default partition, archive old ones",
+        description="Detached entries still count in student_ratings and"
+        " rating_rollups, but a later rebuild-ratings no longer sees them.",
+    )
+    maintain.add_argument(
+        "--ahead", type=int, default=3, help="months to create past the current one"
+    )
+    maintain.add_argument(
+        "--keep",
+        type=int,
+        help="detach partitions older than this many months (default: keep all)",
+    )
+    maintain.add_argument("--archive-schema", default="archive")
+    maintain.set_defaults(handler=maintain_partitions)
+
+    commands.add_parser(
+        "detect-anomalies",
+        help="flag self-judging, reciprocal judging and judge bursts, until stopped",
+    ).set_defaults(handler=detect_anomalies)
+
+    commands.add_parser(
+        "prune-idempotency-keys",
+        help="delete stored responses whose Idempotency-Key has expired",
+    ).set_defaults(handler=prune_idempotency_keys)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
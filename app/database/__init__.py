@@ -1,2 +1,4 @@
 from .base import *
+from .hooks import *
 from .models import *
+from .statements import *
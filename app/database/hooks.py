@@ -0,0 +1,19 @@
+from typing import Callable
+
+from sqlalchemy import event, orm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]):
+    session.sync_session.info.setdefault("on_commit", []).append(callback)
+
+
+@event.listens_for(orm.Session, "after_commit")
+def _run_commit_callbacks(session: orm.Session):
+    for callback in session.info.pop("on_commit", ()):
+        callback()
+
+
+@event.listens_for(orm.Session, "after_rollback")
+def _drop_commit_callbacks(session: orm.Session):
+    session.info.pop("on_commit", None)
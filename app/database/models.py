@@ -6,7 +6,7 @@ import sqlalchemy as sql
 from sqlalchemy import orm
 
 from ..utils import parse_tablename
-from ..schemas import ScoreTypeEnum
+from ..schemas import FlagKind, RollupPeriod, ScoreTypeEnum
 
 
 class Base(orm.DeclarativeBase):
@@ -30,6 +30,73 @@ students_groups_association = sql.Table(
     Base.metadata,
     sql.Column("group_id", sql.ForeignKey("groups.id"), primary_key=True),
     sql.Column("student_id", sql.ForeignKey("students.id"), primary_key=True),
+    sql.Index("ix_students_to_groups_student_id_group_id", "student_id", "group_id"),
+)
+
+
+student_ratings = sql.Table(
+    "student_ratings",
+    Base.metadata,
+    sql.Column("student_id", sql.ForeignKey("students.id"), primary_key=True),
+    sql.Column("score_type", sql.Enum(ScoreTypeEnum), primary_key=True),
+    sql.Column("total", sql.Integer, nullable=False, server_default="0"),
+    sql.Column("entries", sql.Integer, nullable=False, server_default="0"),
+)
+
+rating_rollups = sql.Table(
+    "rating_rollups",
+    Base.metadata,
+    sql.Column("student_id", sql.ForeignKey("students.id"), primary_key=True),
+    sql.Column("score_type", sql.Enum(ScoreTypeEnum), primary_key=True),
+    sql.Column("period", sql.Enum(RollupPeriod), primary_key=True),
+    sql.Column("bucket", sql.Date, primary_key=True),
+    sql.Column("total", sql.Integer, nullable=False, server_default="0"),
+    sql.Column("entries", sql.Integer, nullable=False, server_default="0"),
+)
+
+judge_flags = sql.Table(
+    "judge_flags",
+    Base.metadata,
+    sql.Column("id", sql.Integer, primary_key=True),
+    sql.Column("kind", sql.Enum(FlagKind), nullable=False),
+    sql.Column("judge_id", sql.ForeignKey("students.id"), nullable=False),
+    sql.Column("student_id", sql.ForeignKey("students.id")),
+    # no foreign key: partitioned score_entries is keyed by (id, created_at)
+    sql.Column("score_entry_id", sql.Integer, nullable=False),
+    sql.Column("entries", sql.Integer, nullable=False),
+    sql.Column(
+        "created_at", sql.DateTime, nullable=False, server_default=sql.func.now()
+    ),
+    sql.Index("ix_judge_flags_judge_id_created_at", "judge_id", "created_at"),
+    # an entry observed twice, around a restart, flags once
+    sql.Index(
+        "ix_judge_flags_score_entry_id_kind", "score_entry_id", "kind", unique=True
+    ),
+)
+
+# progress of background consumers of append-only tables
+watermarks = sql.Table(
+    "watermarks",
+    Base.metadata,
+    sql.Column("name", sql.String, primary_key=True),
+    sql.Column("value", sql.BigInteger, nullable=False),
+)
+
+# responses of create requests sent with an Idempotency-Key; status_code is
+# NULL only inside the transaction that claimed the key
+idempotency_keys = sql.Table(
+    "idempotency_keys",
+    Base.metadata,
+    sql.Column("scope", sql.String, primary_key=True),
+    sql.Column("key", sql.String(255), primary_key=True),
+    sql.Column("fingerprint", sql.String(32), nullable=False),
+    sql.Column("status_code", sql.SmallInteger),
+    sql.Column("media_type", sql.String),
+    sql.Column("body", sql.LargeBinary),
+    sql.Column(
+        "created_at", sql.DateTime, nullable=False, server_default=sql.func.now()
+    ),
+    sql.Column("expires_at", sql.DateTime, nullable=False),
 )
 
 
@@ -46,6 +113,10 @@ class Group(Base, TimestampMixin):
 
 
 class Lesson(Base, CreatedAtMixin):
+    __table_args__ = (
+        sql.Index("ix_lessons_group_id_starts_at", "group_id", "starts_at"),
+    )
+
     group_id: orm.Mapped[int] = orm.mapped_column(sql.ForeignKey("groups.id"))
     starts_at: orm.Mapped[datetime]
     ends_at: orm.Mapped[datetime]
@@ -56,6 +127,25 @@ class Lesson(Base, CreatedAtMixin):
 
 
 class ScoreEntry(Base, CreatedAtMixin):
+    __table_args__ = (
+        sql.Index(
+            "ix_score_entries_student_id_score_type_created_at",
+            "student_id",
+            "score_type",
+            "created_at",
+        ),
+        sql.Index("ix_score_entries_judge_id_created_at", "judge_id", "created_at"),
+        sql.Index("ix_score_entries_lesson_id_student_id", "lesson_id", "student_id"),
+        # monthly partitions are managed by app.partitions
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # the partition key has to be part of the primary key
+    id: orm.Mapped[int] = orm.mapped_column(primary_key=True, autoincrement=True)
+    created_at: orm.Mapped[datetime] = orm.mapped_column(
+        primary_key=True, server_default=sql.func.now()
+    )
+
     student_id: orm.Mapped[int] = orm.mapped_column(sql.ForeignKey("students.id"))
     judge_id: orm.Mapped[int] = orm.mapped_column(sql.ForeignKey("students.id"))
     lesson_id: orm.Mapped[int] = orm.mapped_column(sql.ForeignKey("lessons.id"))
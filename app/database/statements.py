@@ -0,0 +1,19 @@
+from typing import Callable, Hashable, TypeVar
+
+from sqlalchemy.sql import Executable
+
+_S = TypeVar("_S", bound=Executable)
+
+_statements: dict[Hashable, Executable] = {}
+
+
+def cached_statement(key: Hashable, build: Callable[[], _S]) -> _S:
+    """Build the statement for `key` once and hand out the same object afterwards.
+
+    A reused statement skips construction and cache key generation, and its SQL
+    text stays identical so asyncpg's prepared statement cache keeps hitting.
+    Anything that varies per call must be a `sql.bindparam`."""
+    stmt = _statements.get(key)
+    if stmt is None:
+        stmt = _statements[key] = build()
+    return stmt
@@ -1,15 +1,38 @@
+from collections import OrderedDict
+import time
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status, Path
+from fastapi import Depends, HTTPException, Request, status, Path
 import sqlalchemy as sql
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import session_factory, Student, Group, Base, Lesson
-
+from .config import settings
+from .database import (
+    cached_statement,
+    read_session_factory,
+    session_factory,
+    Student,
+    Group,
+    Base,
+    Event,
+    Lesson,
+)
+
+_READ_METHODS = {"GET", "HEAD"}
+
+
+async def get_db(request: Request):
+    # opened by a route wrapper (see idempotency), which commits and closes it
+    session = getattr(request.state, "db", None)
+    if session is not None:
+        yield session
+        return
 
-async def get_db():
+    factory = (
+        read_session_factory if request.method in _READ_METHODS else session_factory
+    )
     try:
-        session = session_factory()
+        session = factory()
         yield session
         await session.commit()
     finally:
@@ -22,9 +45,13 @@ DB = Annotated[AsyncSession, Depends(get_db)]
 class _ModelDependency:
     def build_dependency(db_model: Base, name: str):
         async def generated(item_id: Annotated[int, Path(alias=name + "_id")], db: DB):
-            item = (
-                await db.execute(sql.select(db_model).where(db_model.id == item_id))
-            ).scalar()
+            query = cached_statement(
+                ("model", name),
+                lambda: sql.select(db_model).where(
+                    db_model.id == sql.bindparam("item_id")
+                ),
+            )
+            item = (await db.execute(query, {"item_id": item_id})).scalar()
             if item is None:
                 raise HTTPException(
                     status.HTTP_404_NOT_FOUND, f"{name} with such id does not exists"
@@ -40,23 +67,128 @@ class _ModelDependency:
 model = _ModelDependency()
 
 
+class _ExistingIdCache:
+    """LRU of `(name, id)` pairs recently seen to exist, each kept for `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._expires: OrderedDict[tuple[str, int], float] = OrderedDict()
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._expires[key]
+            return False
+        self._expires.move_to_end(key)
+        return True
+
+    def add(self, key: tuple[str, int]):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._expires[key] = time.monotonic() + self.ttl
+        self._expires.move_to_end(key)
+        while len(self._expires) > self.maxsize:
+            self._expires.popitem(last=False)
+
+    def discard(self, name: str, item_id: int):
+        self._expires.pop((name, item_id), None)
+
+    def clear(self):
+        self._expires.clear()
+
+
+existing_ids = _ExistingIdCache(
+    maxsize=settings.existing_ids_cache_size, ttl=settings.existing_ids_ttl
+)
+
+
+_path_models: dict[str, Base] = {}
+# models nested under another one in the path, by the owner's name and the
+# foreign key pointing at it; /groups/1/lessons/2 needs lesson 2 to be group 1's
+_path_owners: dict[str, tuple[str, str]] = {"lesson": ("group", "group_id")}
+
+
+def _path_key(request: Request, name: str) -> tuple:
+    key = (name, int(request.path_params[name + "_id"]))
+    owner = _path_owners.get(name)
+    if owner is not None and owner[0] + "_id" in request.path_params:
+        key += (int(request.path_params[owner[0] + "_id"]),)
+    return key
+
+
+def _path_select(name: str, owned: bool) -> sql.Select:
+    db_model = _path_models[name]
+    query = sql.select(sql.literal(name), db_model.id).where(
+        db_model.id == sql.bindparam(name)
+    )
+    if owned:
+        query = query.where(
+            getattr(db_model, _path_owners[name][1])
+            == sql.bindparam(name + "_owner_id")
+        )
+    return query
+
+
+async def get_path_ids(request: Request, db: DB) -> set[tuple[str, int]]:
+    found, pending = set(), {}
+    for name in _path_models:
+        try:
+            key = _path_key(request, name)
+        except (KeyError, ValueError):
+            continue
+        # ownership is not cached: a moved item must stop matching its old
+        # owner in every worker at once, not when each one's entry expires
+        if len(key) == 2 and key in existing_ids:
+            found.add(key)
+        else:
+            pending[name] = key
+
+    if pending:
+        owned = {name: len(key) > 2 for name, key in pending.items()}
+        query = cached_statement(
+            ("path_ids", *owned.items()),
+            lambda: sql.union_all(
+                *(_path_select(name, owned[name]) for name in pending)
+            ),
+        )
+        params = {}
+        for name, key in pending.items():
+            params[name] = key[1]
+            if owned[name]:
+                params[name + "_owner_id"] = key[2]
+        for name, item_id in await db.execute(query, params):
+            if not owned[name]:
+                existing_ids.add((name, item_id))
+            found.add((name, item_id))
+    return found
+
+
+PathIds = Annotated[set[tuple[str, int]], Depends(get_path_ids)]
+
+
 class _ExistsDependency:
     def build_dependency(db_model: Base, name: str):
-        async def generated(item_id: Annotated[int, Path(alias=name + "_id")], db: DB):
-            item = (
-                await db.execute(sql.select(db_model.id).where(db_model.id == item_id))
-            ).scalar()
-            if item is None:
+        _path_models[name] = db_model
+
+        async def generated(
+            item_id: Annotated[int, Path(alias=name + "_id")],
+            found: PathIds,
+        ):
+            if (name, item_id) not in found:
                 raise HTTPException(
                     status.HTTP_404_NOT_FOUND, f"{name} with such id does not exists"
                 )
-            return item
+            return item_id
 
         return generated
 
     Student = Annotated[int, Depends(build_dependency(Student, "student"))]
     Group = Annotated[int, Depends(build_dependency(Group, "group"))]
     Lesson = Annotated[int, Depends(build_dependency(Lesson, "lesson"))]
+    Event = Annotated[int, Depends(build_dependency(Event, "event"))]
 
 
 exists = _ExistsDependency()
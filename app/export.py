@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .utils import plain
+
+
+class ExportFormat(Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+_media_types = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.ndjson: "application/x-ndjson",
+}
+
+
+async def _stream_rows(
+    db: AsyncSession, query: sql.Select, format: ExportFormat, batch_size: int
+) -> AsyncIterator[bytes]:
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    columns = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format is ExportFormat.csv:
+        writer.writerow(columns)
+
+    async for rows in result.partitions():
+        for row in rows:
+            values = [plain(value) for value in row]
+            if format is ExportFormat.csv:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))) + "\n")
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_response(
+    db: AsyncSession,
+    query: sql.Select,
+    format: ExportFormat,
+    filename: str,
+    batch_size: int = 1000,
+) -> StreamingResponse:
+    """Stream the rows of a column query from a server-side cursor, one batch at a time."""
+    return StreamingResponse(
+        _stream_rows(db, query, format, batch_size),
+        media_type=_media_types[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format.value}"'
+        },
+    )
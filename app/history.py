@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from itertools import accumulate
+
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import ScoreEntry, rating_rollups
+from .schemas import HistoryPoint, RollupPeriod, ScoreTypeEnum
+
+
+def term_start(day: date) -> date:
+    months = sorted(settings.term_start_months)
+    for month in reversed(months):
+        if day.month >= month:
+            return date(day.year, month, 1)
+    return date(day.year - 1, months[-1], 1)
+
+
+def bucket(period: RollupPeriod, day: date) -> date:
+    if period is RollupPeriod.day:
+        return day
+    if period is RollupPeriod.week:
+        return day - timedelta(days=day.weekday())
+    return term_start(day)
+
+
+def bucket_sql(period: RollupPeriod, column: sql.ColumnElement) -> sql.ColumnElement:
+    """SQL counterpart of `bucket`."""
+    if period is not RollupPeriod.term:
+        return sql.cast(sql.func.date_trunc(period.value, column), sql.Date)
+
+    months = sorted(settings.term_start_months)
+    year = sql.cast(sql.extract("year", column), sql.Integer)
+    month = sql.extract("month", column)
+    return sql.case(
+        *(
+            (month >= start, sql.func.make_date(year, start, 1))
+            for start in reversed(months)
+        ),
+        else_=sql.func.make_date(year - 1, months[-1], 1),
+    )
+
+
+def rollup_select(period: RollupPeriod) -> sql.Select:
+    """Rows of `rating_rollups` for one period, computed from raw score entries."""
+    bucket_column = bucket_sql(period, ScoreEntry.created_at)
+    return sql.select(
+        ScoreEntry.student_id,
+        ScoreEntry.score_type,
+        sql.literal(period.name, sql.Enum(RollupPeriod)),
+        bucket_column,
+        sql.func.sum(ScoreEntry.amount),
+        sql.func.count(),
+    ).group_by(ScoreEntry.student_id, ScoreEntry.score_type, bucket_column)
+
+
+async def get_history(
+    db: AsyncSession,
+    students: sql.ColumnElement,
+    period: RollupPeriod,
+    score_type: ScoreTypeEnum | None,
+    since: date | None,
+    until: date | None,
+) -> list[HistoryPoint]:
+    """Per-bucket and running totals for the students matched by `students`.
+
+    Reads only `rating_rollups`; the running total starts from everything
+    recorded before `since`.
+    """
+    query = sql.select(
+        rating_rollups.c.bucket,
+        rating_rollups.c.score_type,
+        sql.func.sum(rating_rollups.c.total),
+    ).where(students, rating_rollups.c.period == period)
+    if score_type is not None:
+        query = query.where(rating_rollups.c.score_type == score_type)
+
+    carried = {}
+    if since is not None:
+        carried = dict(
+            (
+                await db.execute(
+                    query.with_only_columns(
+                        rating_rollups.c.score_type,
+                        sql.func.sum(rating_rollups.c.total),
+                    )
+                    .where(rating_rollups.c.bucket < bucket(period, since))
+                    .group_by(rating_rollups.c.score_type)
+                )
+            ).all()
+        )
+        query = query.where(rating_rollups.c.bucket >= bucket(period, since))
+    if until is not None:
+        query = query.where(rating_rollups.c.bucket < until)
+
+    rows = (
+        await db.execute(
+            query.group_by(
+                rating_rollups.c.bucket, rating_rollups.c.score_type
+            ).order_by(rating_rollups.c.bucket)
+        )
+    ).all()
+
+    series: dict[ScoreTypeEnum, list] = {}
+    for bucket_date, row_score_type, total in rows:
+        series.setdefault(row_score_type, []).append((bucket_date, total))
+    points = []
+    for row_score_type, buckets in series.items():
+        running = accumulate(
+            (total for _, total in buckets), initial=carried.get(row_score_type, 0)
+        )
+        next(running)
+        points.extend(
+            HistoryPoint(
+                bucket=bucket_date,
+                score_type=row_score_type,
+                total=total,
+                cumulative=cumulative,
+            )
+            for (bucket_date, total), cumulative in zip(buckets, running)
+        )
+    points.sort(key=lambda point: (point.bucket, point.score_type.value))
+    return points
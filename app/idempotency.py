@@ -0,0 +1,211 @@
+from collections import OrderedDict
+from datetime import timedelta
+import hashlib
+import time
+from typing import NamedTuple
+
+from fastapi import HTTPException, Request, Response, status
+import sqlalchemy as sql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import idempotency_keys, session_factory
+from .routing import Route, wrap_route
+
+HEADER = "Idempotency-Key"
+
+
+class Stored(NamedTuple):
+    fingerprint: str
+    status_code: int
+    media_type: str | None
+    body: bytes
+
+
+class RecentResponses:
+    """LRU of finished responses by `(scope, key)`, each kept for `ttl` seconds.
+
+    Only finished responses are kept: they never change until they expire, so
+    this worker can replay them without asking Postgres.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[Stored, float]] = (
+            OrderedDict()
+        )
+
+    def get(self, key: tuple[str, str]) -> Stored | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored, expires = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return stored
+
+    def put(self, key: tuple[str, str], stored: Stored):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (stored, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+recent = RecentResponses(
+    maxsize=settings.idempotency_cache_size, ttl=settings.idempotency_ttl
+)
+
+
+def _where(scope: str, key: str) -> sql.ColumnElement:
+    return (idempotency_keys.c.scope == scope) & (idempotency_keys.c.key == key)
+
+
+async def _claim(
+    db: AsyncSession, scope: str, key: str, fingerprint: str
+) -> Stored | None:
+    """Take the key in the request's transaction, or return what an earlier
+    request stored under it.
+
+    A concurrent request with the same key waits on the row until this
+    transaction commits, and then replays, or rolls back, and then takes over.
+    """
+    now = sql.func.now()
+    stmt = postgresql.insert(idempotency_keys).values(
+        scope=scope,
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=settings.idempotency_ttl),
+    )
+    claimed = (
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[idempotency_keys.c.scope, idempotency_keys.c.key],
+                set_={
+                    "fingerprint": stmt.excluded.fingerprint,
+                    "status_code": None,
+                    "media_type": None,
+                    "body": None,
+                    "created_at": now,
+                    "expires_at": stmt.excluded.expires_at,
+                },
+                where=idempotency_keys.c.expires_at < now,
+            ).returning(idempotency_keys.c.key)
+        )
+    ).scalar()
+    if claimed is not None:
+        return None
+    row = (
+        await db.execute(
+            sql.select(
+                idempotency_keys.c.fingerprint,
+                idempotency_keys.c.status_code,
+                idempotency_keys.c.media_type,
+                idempotency_keys.c.body,
+            ).where(_where(scope, key))
+        )
+    ).one()
+    return Stored(*row)
+
+
+async def _store(db: AsyncSession, scope: str, key: str, stored: Stored):
+    await db.execute(
+        sql.update(idempotency_keys)
+        .where(_where(scope, key))
+        .values(
+            status_code=stored.status_code,
+            media_type=stored.media_type,
+            body=stored.body,
+        )
+    )
+
+
+async def _release(db: AsyncSession, scope: str, key: str):
+    await db.execute(sql.delete(idempotency_keys).where(_where(scope, key)))
+
+
+def _replay(stored: Stored, fingerprint: str) -> Response:
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f"{HEADER} was already used with a different request body",
+        )
+    return Response(
+        stored.body,
+        status_code=stored.status_code,
+        media_type=stored.media_type,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def keyed(request: Request) -> bool:
+    return HEADER in request.headers
+
+
+async def prune() -> int:
+    async with session_factory() as db, db.begin():
+        result = await db.execute(
+            sql.delete(idempotency_keys).where(
+                idempotency_keys.c.expires_at < sql.func.now()
+            )
+        )
+    return result.rowcount
+
+
+def idempotent():
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    Keys are scoped to method and path. Only 2xx responses are stored; after
+    an error or a failure nothing is, and the client may retry with the same key.
+    """
+
+    def wrapper(route: Route, handler):
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(HEADER)
+            if key is None:
+                return await handler(request)
+            if not 0 < len(key) <= 255:
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST, f"{HEADER} must be 1-255 characters"
+                )
+            scope = f"{request.method} {request.url.path}"
+            fingerprint = hashlib.blake2b(
+                await request.body(), digest_size=16
+            ).hexdigest()
+
+            stored = recent.get((scope, key))
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            async with session_factory() as db:
+                stored = await _claim(db, scope, key, fingerprint)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+                # the endpoint's `dep.DB` is this session, so the key, the
+                # response and the rows it created commit together, before
+                # the response goes out
+                request.state.db = db
+                response = await handler(request)
+                if 200 <= response.status_code < 300 and hasattr(response, "body"):
+                    stored = Stored(
+                        fingerprint,
+                        response.status_code,
+                        response.media_type,
+                        response.body,
+                    )
+                    await _store(db, scope, key, stored)
+                else:
+                    await _release(db, scope, key)
+                await db.commit()
+            if stored is not None:
+                recent.put((scope, key), stored)
+            return response
+
+        return idempotent_handler
+
+    return wrap_route(wrapper)
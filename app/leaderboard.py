@@ -0,0 +1,194 @@
+import asyncio
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import (
+    ScoreEntry,
+    session_factory,
+    student_ratings,
+    students_groups_association,
+)
+from .periodic import Periodic
+from .schemas import ScoreTypeEnum
+
+IndexKey = tuple[int | None, ScoreTypeEnum | None]
+
+
+class SortedIndex:
+    """Students ordered by total (descending), ties broken by student id."""
+
+    def __init__(self):
+        self._keys: list[tuple[int, int]] = []
+        self._totals: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, student_id: int):
+        return student_id in self._totals
+
+    def update(self, student_id: int, total: int):
+        self.remove(student_id)
+        self._totals[student_id] = total
+        insort(self._keys, (-total, student_id))
+
+    def remove(self, student_id: int):
+        total = self._totals.pop(student_id, None)
+        if total is not None:
+            del self._keys[bisect_left(self._keys, (-total, student_id))]
+
+    def total(self, student_id: int) -> int:
+        return self._totals.get(student_id, 0)
+
+    def rank(self, total: int) -> int:
+        return bisect_left(self._keys, (-total,)) + 1
+
+    def position(self, student_id: int) -> int | None:
+        total = self._totals.get(student_id)
+        if total is None:
+            return None
+        return bisect_left(self._keys, (-total, student_id))
+
+    def slice(self, start: int, stop: int) -> list[tuple[int, int, int]]:
+        """(rank, student_id, total) for positions in [start, stop)."""
+        result = []
+        for neg_total, student_id in self._keys[max(start, 0) : stop]:
+            if result and result[-1][2] == -neg_total:
+                rank = result[-1][0]
+            else:
+                rank = self.rank(-neg_total)
+            result.append((rank, student_id, -neg_total))
+        return result
+
+
+class Leaderboard:
+    """In-process rank indexes per (group, score type), `None` meaning "all".
+
+    Seeded from `student_ratings` on startup and kept current by `ratings.apply`
+    and the membership endpoints once the writing transaction commits. Each
+    worker holds its own copy; other workers' changes come through the NOTIFY
+    bridge with `live_notify`, and otherwise with a reload every
+    `leaderboard_reload_interval` seconds.
+    """
+
+    def __init__(self):
+        self._totals: dict[tuple[int, ScoreTypeEnum | None], int] = defaultdict(int)
+        self._groups: dict[int, set[int]] = defaultdict(set)
+        self._indexes: dict[IndexKey, SortedIndex] = defaultdict(SortedIndex)
+
+    async def load(self, db: AsyncSession):
+        memberships = (
+            await db.execute(
+                sql.select(
+                    students_groups_association.c.group_id,
+                    students_groups_association.c.student_id,
+                )
+            )
+        ).all()
+        ratings = (
+            await db.execute(
+                sql.select(
+                    student_ratings.c.student_id,
+                    student_ratings.c.score_type,
+                    student_ratings.c.total,
+                )
+            )
+        ).all()
+        # built aside, off the event loop, and swapped in: readers never see a
+        # half-loaded board
+        fresh = await asyncio.to_thread(Leaderboard._build, memberships, ratings)
+        self._totals, self._groups, self._indexes = (
+            fresh._totals,
+            fresh._groups,
+            fresh._indexes,
+        )
+
+    @classmethod
+    def _build(cls, memberships, ratings) -> "Leaderboard":
+        board = cls()
+        for group_id, student_id in memberships:
+            board._groups[student_id].add(group_id)
+        for student_id, score_type, total in ratings:
+            board._totals[student_id, score_type] += total
+            board._totals[student_id, None] += total
+        for (student_id, score_type), total in board._totals.items():
+            board._indexes[None, score_type].update(student_id, total)
+        for student_id, group_ids in board._groups.items():
+            for group_id in group_ids:
+                board._index_member(group_id, student_id)
+        return board
+
+    def _index_member(self, group_id: int, student_id: int):
+        for score_type in (None, *ScoreTypeEnum):
+            self._indexes[group_id, score_type].update(
+                student_id, self._totals.get((student_id, score_type), 0)
+            )
+
+    def index(self, group_id: int | None, score_type: ScoreTypeEnum | None):
+        return self._indexes.get((group_id, score_type)) or SortedIndex()
+
+    def groups_of(self, student_id: int) -> set[int]:
+        return self._groups.get(student_id, set())
+
+    def apply(self, deltas: dict[tuple[int, ScoreTypeEnum], list[int]]):
+        for (student_id, score_type), (amount, _) in deltas.items():
+            for key in (score_type, None):
+                self._totals[student_id, key] += amount
+                total = self._totals[student_id, key]
+                self._indexes[None, key].update(student_id, total)
+                for group_id in self.groups_of(student_id):
+                    self._indexes[group_id, key].update(student_id, total)
+
+    def add_member(self, group_id: int, student_id: int):
+        self._groups[student_id].add(group_id)
+        self._index_member(group_id, student_id)
+
+    def remove_member(self, group_id: int, student_id: int):
+        self._groups[student_id].discard(group_id)
+        for score_type in (None, *ScoreTypeEnum):
+            self._indexes[group_id, score_type].remove(student_id)
+
+
+board = Leaderboard()
+
+
+async def _reload_board():
+    async with session_factory() as db:
+        await board.load(db)
+
+
+reloader = Periodic(_reload_board, lambda: settings.leaderboard_reload_interval)
+
+
+async def ranked_between(
+    db: AsyncSession,
+    group_id: int | None,
+    score_type: ScoreTypeEnum | None,
+    since: datetime | None,
+    until: datetime | None,
+) -> list[tuple[int, int, int]]:
+    """(rank, student_id, total) computed from raw score entries for a date range."""
+    total = sql.func.sum(ScoreEntry.amount)
+    query = sql.select(
+        sql.func.rank().over(order_by=total.desc()),
+        ScoreEntry.student_id,
+        total,
+    ).group_by(ScoreEntry.student_id)
+    if group_id is not None:
+        query = query.join(
+            students_groups_association,
+            students_groups_association.c.student_id == ScoreEntry.student_id,
+        ).where(students_groups_association.c.group_id == group_id)
+    if score_type is not None:
+        query = query.where(ScoreEntry.score_type == score_type)
+    if since is not None:
+        query = query.where(ScoreEntry.created_at >= since)
+    if until is not None:
+        query = query.where(ScoreEntry.created_at < until)
+    resp = await db.execute(query.order_by(total.desc(), ScoreEntry.student_id))
+    return [tuple(row) for row in resp]
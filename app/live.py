@@ -0,0 +1,205 @@
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import logging
+import os
+from typing import Iterable
+
+import asyncpg
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import on_commit
+from .leaderboard import board
+from .schemas import ScoreTypeEnum
+from . import search
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "ftk_live"
+MEMBERS_CHANNEL = "ftk_members"
+# stays well below the 8000 byte NOTIFY payload limit
+_NOTIFY_CHUNK = 100
+
+Deltas = dict[tuple[int, ScoreTypeEnum], list[int]]
+
+
+class Subscription:
+    """Bounded event queue of one client; the oldest events are dropped when full."""
+
+    def __init__(self, group_id: int, maxsize: int):
+        self.group_id = group_id
+        self._queue: asyncio.Queue[tuple[int, ScoreTypeEnum, int]] = asyncio.Queue(
+            maxsize
+        )
+        self.lagged = False
+
+    def put(self, event: tuple[int, ScoreTypeEnum, int]):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.lagged = True
+        self._queue.put_nowait(event)
+
+    async def next_batch(self, window: float, timeout: float) -> dict | None:
+        """Wait up to `timeout` for an event, then coalesce the next `window` seconds."""
+        try:
+            events = [await asyncio.wait_for(self._queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return None
+        await asyncio.sleep(window)
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+
+        merged: dict[tuple[int, ScoreTypeEnum], int] = defaultdict(int)
+        for student_id, score_type, delta in events:
+            merged[student_id, score_type] += delta
+        changes = []
+        for (student_id, score_type), delta in merged.items():
+            # ranks as of sending, so one batch is a consistent snapshot
+            index = board.index(self.group_id, score_type)
+            total = index.total(student_id)
+            changes.append(
+                {
+                    "student_id": student_id,
+                    "score_type": score_type.value,
+                    "delta": delta,
+                    "total": total,
+                    "rank": index.rank(total),
+                }
+            )
+        batch = {"type": "scores", "changes": changes}
+        if self.lagged:
+            # events were dropped, the client should refetch the leaderboard
+            batch["resync"] = True
+            self.lagged = False
+        return batch
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, group_id: int):
+        subscription = Subscription(group_id, settings.live_queue_size)
+        self._subscribers[group_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers[group_id].discard(subscription)
+            if not self._subscribers[group_id]:
+                del self._subscribers[group_id]
+
+    def deliver(self, deltas: Deltas):
+        for (student_id, score_type), (amount, _) in deltas.items():
+            for group_id in board.groups_of(student_id) & self._subscribers.keys():
+                for subscription in self._subscribers[group_id]:
+                    subscription.put((student_id, score_type, amount))
+
+
+hub = Hub()
+
+
+async def publish(db: AsyncSession, deltas: Deltas):
+    """Announce committed rating deltas to live subscribers.
+
+    With `live_notify` the deltas travel through a transactional NOTIFY, so
+    every worker, this one included, hears about them only once they commit.
+    """
+    if not settings.live_notify:
+        on_commit(db, lambda: hub.deliver(deltas))
+        return
+
+    items = [
+        [student_id, score_type.value, amount, entries]
+        for (student_id, score_type), (amount, entries) in deltas.items()
+    ]
+    for start in range(0, len(items), _NOTIFY_CHUNK):
+        payload = {"pid": os.getpid(), "deltas": items[start : start + _NOTIFY_CHUNK]}
+        await db.execute(sql.select(sql.func.pg_notify(CHANNEL, json.dumps(payload))))
+
+
+async def publish_members(
+    db: AsyncSession,
+    group_id: int,
+    added: Iterable[int] = (),
+    removed: Iterable[int] = (),
+):
+    """Apply a membership change to the leaderboard of every worker once `db`
+    commits; other workers hear about it through a transactional NOTIFY."""
+    added, removed = sorted(added), sorted(removed)
+
+    def update_board():
+        for student_id in added:
+            board.add_member(group_id, student_id)
+        for student_id in removed:
+            board.remove_member(group_id, student_id)
+
+    on_commit(db, update_board)
+    if not settings.live_notify:
+        return
+    for key, student_ids in (("added", added), ("removed", removed)):
+        for start in range(0, len(student_ids), _NOTIFY_CHUNK):
+            payload = {
+                "pid": os.getpid(),
+                "group_id": group_id,
+                key: student_ids[start : start + _NOTIFY_CHUNK],
+            }
+            await db.execute(
+                sql.select(sql.func.pg_notify(MEMBERS_CHANNEL, json.dumps(payload)))
+            )
+
+
+class NotifyBridge:
+    def __init__(self):
+        self._conn: asyncpg.Connection | None = None
+
+    async def start(self):
+        self._conn = await asyncpg.connect(
+            settings.database_url.replace("+asyncpg", "")
+        )
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        await self._conn.add_listener(MEMBERS_CHANNEL, self._on_members)
+        await self._conn.add_listener(search.CHANNEL, search.on_notify)
+
+    async def stop(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            message = json.loads(payload)
+            deltas = {
+                (student_id, ScoreTypeEnum(score_type)): [amount, entries]
+                for student_id, score_type, amount, entries in message["deltas"]
+            }
+        except (ValueError, KeyError, TypeError):
+            log.warning("ignoring malformed %s payload: %r", CHANNEL, payload)
+            return
+        if message.get("pid") != os.getpid():
+            # our own writes were applied to the leaderboard on commit
+            board.apply(deltas)
+        hub.deliver(deltas)
+
+    def _on_members(self, connection, pid, channel, payload: str):
+        try:
+            message = json.loads(payload)
+            group_id = int(message["group_id"])
+            added = [int(i) for i in message.get("added", ())]
+            removed = [int(i) for i in message.get("removed", ())]
+        except (ValueError, KeyError, TypeError):
+            log.warning("ignoring malformed %s payload: %r", MEMBERS_CHANNEL, payload)
+            return
+        if message.get("pid") == os.getpid():
+            # our own changes were applied to the leaderboard on commit
+            return
+        for student_id in added:
+            board.add_member(group_id, student_id)
+        for student_id in removed:
+            board.remove_member(group_id, student_id)
+
+
+bridge = NotifyBridge()
@@ -1,8 +1,106 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi_pagination import add_pagination
+from sqlalchemy import orm
 
+from .analytics import snapshot
+from .anomalies import pipeline
+from .config import settings
+from .database import engine, read_engine, session_factory
+from .leaderboard import board, reloader as board_reloader
+from .live import bridge
+from .metrics import MetricsMiddleware, registry
 from .routers import router
+from .search import names, reloader as names_reloader
+from .writebehind import writer
 
 app = FastAPI()
 app.include_router(router)
 add_pagination(app)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+def configure_mappers():
+    # up front and once, instead of inside whichever request first touches the ORM
+    orm.configure_mappers()
+
+
+@app.on_event("startup")
+async def load_leaderboard():
+    async with session_factory() as db:
+        await board.load(db)
+
+
+@app.on_event("startup")
+def start_leaderboard_reloads():
+    # without NOTIFY, other workers' changes only arrive through reloads
+    if not settings.live_notify:
+        board_reloader.start()
+
+
+@app.on_event("shutdown")
+async def stop_leaderboard_reloads():
+    await board_reloader.stop()
+
+
+@app.on_event("startup")
+async def load_name_index():
+    if settings.student_search_index:
+        async with session_factory() as db:
+            await names.load(db)
+
+
+@app.on_event("startup")
+def start_name_index_reloads():
+    if settings.student_search_index and not settings.live_notify:
+        names_reloader.start()
+
+
+@app.on_event("shutdown")
+async def stop_name_index_reloads():
+    await names_reloader.stop()
+
+
+@app.on_event("startup")
+async def start_live_bridge():
+    if settings.live_notify:
+        await bridge.start()
+
+
+@app.on_event("shutdown")
+async def stop_live_bridge():
+    await bridge.stop()
+
+
+@app.on_event("startup")
+def start_anomaly_pipeline():
+    if settings.anomaly_detection:
+        pipeline.start()
+
+
+@app.on_event("shutdown")
+async def stop_anomaly_pipeline():
+    await pipeline.stop()
+
+
+@app.on_event("shutdown")
+async def stop_analytics_refresh():
+    await snapshot.stop()
+
+
+@app.on_event("shutdown")
+async def flush_score_writer():
+    await writer.stop()
+
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return registry.render()
@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+slow_query_log = logging.getLogger("app.sql.slow")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 1000, 10000)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] += amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name + _format_labels(self.labels, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] -= amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = defaultdict(float)
+
+    def observe(self, value: float, *labels):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self):
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(
+                    self.labels, labels, le=bound
+                ), cumulative
+            yield self.name + "_sum" + _format_labels(self.labels, labels), self._sums[
+                labels
+            ]
+            yield self.name + "_count" + _format_labels(self.labels, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter("http_requests_total", "Requests served.", ("method", "route", "status"))
+)
+http_latency = registry.register(
+    Histogram("http_request_duration_seconds", "Request latency.", ("method", "route"))
+)
+http_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "Requests currently being served.")
+)
+db_latency = registry.register(
+    Histogram(
+        "db_statement_duration_seconds", "SQL statement latency.", ("engine", "verb")
+    )
+)
+db_rows = registry.register(
+    Histogram(
+        "db_statement_rows",
+        "Rows returned or affected per statement.",
+        ("engine", "verb"),
+        COUNT_BUCKETS,
+    )
+)
+db_queries_per_request = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements issued while serving one request.",
+        ("route",),
+        COUNT_BUCKETS,
+    )
+)
+db_pool_wait = registry.register(
+    Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection.")
+)
+
+_request_queries: ContextVar[list[int] | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+class TimedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context._started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - context._started
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        db_latency.observe(duration, name, verb)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            db_rows.observe(cursor.rowcount, name, verb)
+
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+
+        threshold = settings.slow_query_threshold
+        if threshold is not None and duration >= threshold:
+            slow_query_log.warning("%.3fs on %s: %s", duration, name, statement)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes = None
+
+    def _route_path(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "<unmatched>")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            http_in_flight.dec()
+            _request_queries.reset(token)
+            route = self._route_path(scope)
+            http_latency.observe(duration, scope["method"], route)
+            http_requests.inc(scope["method"], route, status_code)
+            db_queries_per_request.observe(queries[0], route)
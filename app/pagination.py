@@ -0,0 +1,78 @@
+import base64
+import json
+from typing import Annotated, Generic, Sequence, TypeVar
+
+from fastapi import Depends, HTTPException, Query, status
+from pydantic.generics import GenericModel
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+class CursorPage(GenericModel, Generic[T]):
+    items: Sequence[T]
+    next_cursor: str | None
+    total: int | None
+
+
+class _CursorParams:
+    def __init__(
+        self,
+        cursor: str | None = None,
+        size: Annotated[int, Query(ge=1, le=100)] = 50,
+        include_total: bool = False,
+    ):
+        self.cursor = cursor
+        self.size = size
+        self.include_total = include_total
+
+
+CursorParams = Annotated[_CursorParams, Depends()]
+
+
+def _encode_cursor(value: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        value = None
+    # keys are integer id columns; anything else would fail in Postgres as a 500
+    if type(value) is not int or not -(2**31) <= value < 2**31:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "invalid cursor")
+    return value
+
+
+async def paginate(
+    db: AsyncSession,
+    query: sql.Select,
+    params: _CursorParams,
+    key: sql.ColumnElement,
+    rows: bool = False,
+) -> CursorPage:
+    """Keyset pagination over a unique, indexed `key` column.
+
+    Every page is a `WHERE key > :last ORDER BY key LIMIT :size` range scan, so
+    deep pages cost the same as the first one. Counting is opt-in. With `rows`
+    the query selects columns and items are plain dicts, see `app.rows`.
+    """
+    total = None
+    if params.include_total:
+        total = (
+            await db.execute(sql.select(sql.func.count()).select_from(query.subquery()))
+        ).scalar()
+
+    if params.cursor is not None:
+        query = query.where(key > _decode_cursor(params.cursor))
+    result = await db.execute(query.order_by(key).limit(params.size + 1))
+    items = [row._asdict() for row in result] if rows else result.scalars().all()
+
+    next_cursor = None
+    if len(items) > params.size:
+        items = items[: params.size]
+        last = items[-1][key.key] if rows else getattr(items[-1], key.key)
+        next_cursor = _encode_cursor(last)
+    return CursorPage(items=items, next_cursor=next_cursor, total=total)
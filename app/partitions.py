@@ -0,0 +1,128 @@
+"""Monthly range partitions of `score_entries` on `created_at`.
+
+Rows outside every monthly partition land in `score_entries_default`, where
+pruning cannot skip them; creating the partition for their month moves them
+out of it, and `maintain` does so for every month the default holds rows of.
+"""
+
+from datetime import date
+import re
+from typing import Iterable
+
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+TABLE = "score_entries"
+DEFAULT = f"{TABLE}_default"
+_NAME = re.compile(rf"{TABLE}_y(\d{{4}})m(\d{{2}})")
+
+
+def add_months(month: date, count: int) -> date:
+    year, index = divmod(month.year * 12 + month.month - 1 + count, 12)
+    return date(year, index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    match = _NAME.fullmatch(name)
+    return match and date(int(match[1]), int(match[2]), 1)
+
+
+def is_partition(name: str) -> bool:
+    return name == DEFAULT or partition_month(name) is not None
+
+
+def create_default_sql() -> str:
+    return f"CREATE TABLE {DEFAULT} PARTITION OF {TABLE} DEFAULT"
+
+
+def create_partition_sql(month: date) -> list[str]:
+    """Statements that add the partition for `month`, whatever the default holds."""
+    name, start, end = partition_name(month), month, add_months(month, 1)
+    bounds = f"created_at >= '{start}' AND created_at < '{end}'"
+    return [
+        f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT} WHERE {bounds} RETURNING *)"
+        f" INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name}"
+        f" FOR VALUES FROM ('{start}') TO ('{end}')",
+    ]
+
+
+def detach_partition_sql(month: date, archive_schema: str) -> list[str]:
+    name = partition_name(month)
+    return [
+        f"ALTER TABLE {TABLE} DETACH PARTITION {name}",
+        f"CREATE SCHEMA IF NOT EXISTS {archive_schema}",
+        f"ALTER TABLE {name} SET SCHEMA {archive_schema}",
+    ]
+
+
+async def attached_months(db: AsyncSession) -> set[date]:
+    names = await db.execute(
+        sql.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            f" WHERE i.inhparent = '{TABLE}'::regclass"
+        )
+    )
+    return {month for (name,) in names if (month := partition_month(name))}
+
+
+async def default_months(db: AsyncSession) -> set[date]:
+    """Months with rows in the default partition."""
+    months = await db.execute(
+        sql.text(
+            f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {DEFAULT}"
+        )
+    )
+    return set(months.scalars())
+
+
+async def cover(db: AsyncSession, months: Iterable[date]) -> list[date]:
+    """Create the partitions missing for `months`; returns the months created."""
+    created = sorted(set(months) - await attached_months(db))
+    for month in created:
+        for statement in create_partition_sql(month):
+            await db.execute(sql.text(statement))
+    return created
+
+
+def months_between(first: date, last: date) -> list[date]:
+    """First days of the months from `first` to `last`, both included."""
+    month, last = first.replace(day=1), last.replace(day=1)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+async def maintain(
+    db: AsyncSession,
+    today: date,
+    ahead: int,
+    keep: int | None,
+    archive_schema: str,
+) -> tuple[list[date], list[date]]:
+    """Create partitions up to `ahead` months past `today`, and for every month
+    with rows in the default partition; detach the ones older than `keep` months
+    into `archive_schema`. Returns (created, detached)."""
+    current = today.replace(day=1)
+    created = await cover(
+        db,
+        months_between(current, add_months(current, ahead))
+        + sorted(await default_months(db)),
+    )
+
+    detached = []
+    if keep is not None:
+        attached = await attached_months(db)
+        cutoff = add_months(current, -keep)
+        detached = sorted(month for month in attached if month < cutoff)
+        for month in detached:
+            for statement in detach_partition_sql(month, archive_schema):
+                await db.execute(sql.text(statement))
+    return created, detached
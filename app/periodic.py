@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+
+class Periodic:
+    """Runs `job` in a background task every `interval()` seconds until stopped.
+
+    The interval is read again before each run; a failed run is logged and the
+    next one goes ahead as scheduled.
+    """
+
+    def __init__(
+        self, job: Callable[[], Awaitable[None]], interval: Callable[[], float]
+    ):
+        self.job = job
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval())
+            try:
+                await self.job()
+            except Exception:
+                log.exception("%s failed", self.job.__qualname__)
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Iterable, Protocol
+
+import sqlalchemy as sql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import (
+    ScoreEntry,
+    cached_statement,
+    on_commit,
+    rating_rollups,
+    student_ratings,
+)
+from .history import bucket, rollup_select
+from .leaderboard import board
+from . import cache, live
+from .schemas import RollupPeriod, ScoreTypeEnum
+
+
+class _Entry(Protocol):
+    student_id: int
+    judge_id: int
+    score_type: ScoreTypeEnum
+    amount: int
+    created_at: datetime
+
+
+# what `apply` needs to know about a written entry, for RETURNING clauses
+DELTA_COLUMNS = (
+    ScoreEntry.student_id,
+    ScoreEntry.judge_id,
+    ScoreEntry.score_type,
+    ScoreEntry.amount,
+    ScoreEntry.created_at,
+)
+
+
+def _collect(
+    added: Iterable[_Entry],
+    removed: Iterable[_Entry],
+    keys: Callable[[_Entry], Iterable[tuple]],
+) -> dict[tuple, list[int]]:
+    deltas = defaultdict(lambda: [0, 0])
+    for sign, entries in ((1, added), (-1, removed)):
+        for entry in entries:
+            for key in keys(entry):
+                delta = deltas[key]
+                delta[0] += sign * entry.amount
+                delta[1] += sign
+    return {key: delta for key, delta in deltas.items() if delta != [0, 0]}
+
+
+def _rating_keys(entry: _Entry):
+    yield entry.student_id, entry.score_type
+
+
+def _rollup_keys(entry: _Entry):
+    for period in RollupPeriod:
+        yield (
+            entry.student_id,
+            entry.score_type,
+            period,
+            bucket(period, entry.created_at.date()),
+        )
+
+
+def _lock_order(item: tuple[tuple, list[int]]) -> tuple:
+    return tuple(getattr(part, "value", part) for part in item[0])
+
+
+async def _upsert(
+    db: AsyncSession,
+    table: sql.Table,
+    key_columns: tuple[str, ...],
+    deltas: dict[tuple, list[int]],
+):
+    # rows are locked in VALUES order; one order for every writer keeps
+    # concurrent upserts of overlapping keys from deadlocking each other
+    stmt = postgresql.insert(table).values(
+        [
+            {**dict(zip(key_columns, key)), "total": total, "entries": entries}
+            for key, (total, entries) in sorted(deltas.items(), key=_lock_order)
+        ]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c[column] for column in key_columns],
+            set_={
+                "total": table.c.total + stmt.excluded.total,
+                "entries": table.c.entries + stmt.excluded.entries,
+            },
+        )
+    )
+
+
+async def apply(
+    db: AsyncSession,
+    added: Iterable[_Entry] = (),
+    removed: Iterable[_Entry] = (),
+):
+    """Fold written score entries into the rating aggregates in the same transaction."""
+    added, removed = list(added), list(removed)
+    cache.invalidate(
+        db,
+        *{f"student:{entry.student_id}:scores" for entry in (*added, *removed)},
+        *{f"student:{entry.judge_id}:judged" for entry in (*added, *removed)},
+    )
+
+    deltas = _collect(added, removed, _rating_keys)
+    if deltas:
+        await _upsert(db, student_ratings, ("student_id", "score_type"), deltas)
+        on_commit(db, lambda: board.apply(deltas))
+        await live.publish(db, deltas)
+
+    rollup_deltas = _collect(added, removed, _rollup_keys)
+    if rollup_deltas:
+        await _upsert(
+            db,
+            rating_rollups,
+            ("student_id", "score_type", "period", "bucket"),
+            rollup_deltas,
+        )
+
+
+async def rebuild(db: AsyncSession):
+    """Recompute the rating aggregates from scratch, blocking score writes meanwhile."""
+    await db.execute(sql.text("LOCK TABLE score_entries IN SHARE MODE"))
+    await db.execute(sql.delete(student_ratings))
+    await db.execute(
+        sql.insert(student_ratings).from_select(
+            ["student_id", "score_type", "total", "entries"],
+            sql.select(
+                ScoreEntry.student_id,
+                ScoreEntry.score_type,
+                sql.func.sum(ScoreEntry.amount),
+                sql.func.count(),
+            ).group_by(ScoreEntry.student_id, ScoreEntry.score_type),
+        )
+    )
+    await db.execute(sql.delete(rating_rollups))
+    for period in RollupPeriod:
+        await db.execute(
+            sql.insert(rating_rollups).from_select(
+                ["student_id", "score_type", "period", "bucket", "total", "entries"],
+                rollup_select(period),
+            )
+        )
+
+
+async def get_student_ratings(db: AsyncSession, student_id: int):
+    query = cached_statement(
+        "student_ratings",
+        lambda: sql.select(student_ratings).where(
+            student_ratings.c.student_id == sql.bindparam("student_id")
+        ),
+    )
+    resp = await db.execute(query, {"student_id": student_id})
+    return resp.all()
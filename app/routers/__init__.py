@@ -1,7 +1,10 @@
-from . import students, groups
+from . import students, groups, leaderboard, events, analytics
 
 from fastapi import APIRouter
 
 router = APIRouter()
 router.include_router(students.router)
 router.include_router(groups.router)
+router.include_router(leaderboard.router)
+router.include_router(events.router)
+router.include_router(analytics.router)
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from ..analytics import snapshot
+from ..schemas import (
+    EventUptake,
+    JudgeBias,
+    ScoreTypeEnum,
+    ScoreTypePercentiles,
+    StudentZScore,
+)
+from .. import dependencies as dep
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/percentiles", response_model=list[ScoreTypePercentiles])
+async def get_percentiles(since: date | None = None, until: date | None = None):
+    await snapshot.ready()
+    return snapshot.percentiles(since, until)
+
+
+@router.get("/groups/{group_id}/zscores", response_model=list[StudentZScore])
+async def get_group_zscores(
+    group: dep.exists.Group,
+    score_type: ScoreTypeEnum | None = None,
+    since: date | None = None,
+    until: date | None = None,
+):
+    await snapshot.ready()
+    return snapshot.group_zscores(group, score_type, since, until)
+
+
+@router.get("/judges", response_model=list[JudgeBias])
+async def get_judge_bias(
+    since: date | None = None,
+    until: date | None = None,
+    min_entries: Annotated[int, Query(ge=1)] = 10,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+):
+    await snapshot.ready()
+    return snapshot.judge_bias(since, until, min_entries, limit)
+
+
+@router.get("/events", response_model=list[EventUptake])
+async def get_event_uptake(
+    since: date | None = None,
+    until: date | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+):
+    await snapshot.ready()
+    return snapshot.event_uptake(since, until, limit)
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, status
+import sqlalchemy as sql
+
+from ..database import (
+    Event,
+    Group,
+    Lesson,
+    ScoreEntry,
+    Student,
+    students_groups_association,
+)
+from ..schemas import AwardResult, EventAward
+from .. import dependencies as dep, ratings
+from ..routing import Route
+
+router = APIRouter(prefix="/events", tags=["events"], route_class=Route)
+
+
+@router.post("/{event_id}/award", response_model=AwardResult)
+async def award_event(event: dep.exists.Event, schema: EventAward, db: dep.DB):
+    context = (
+        await db.execute(
+            sql.select(
+                Lesson.group_id,
+                Group.default_score_type,
+                sql.select(Event.base_amount)
+                .where(Event.id == event)
+                .scalar_subquery()
+                .label("base_amount"),
+                sql.exists().where(Student.id == schema.judge_id).label("judge_exists"),
+            )
+            .join(Group, Group.id == Lesson.group_id)
+            .where(Lesson.id == schema.lesson_id)
+        )
+    ).one_or_none()
+    if context is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "lesson with such id does not exists"
+        )
+    if not context.judge_exists:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "judge with such id does not exists"
+        )
+    amount = context.base_amount if schema.amount is None else schema.amount
+    if amount is None:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "event has no base_amount, pass amount explicitly",
+        )
+    score_type = schema.score_type or context.default_score_type
+    if score_type is None:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "group has no default_score_type, pass score_type explicitly",
+        )
+
+    if schema.student_ids is None:
+        students = sql.select(students_groups_association.c.student_id).where(
+            students_groups_association.c.group_id == context.group_id
+        )
+    else:
+        students = schema.student_ids
+
+    rows = (
+        await db.execute(
+            sql.insert(ScoreEntry)
+            .from_select(
+                ["student_id", "judge_id", "lesson_id", "amount", "score_type"]
+                + ["event_id"],
+                sql.select(
+                    Student.id,
+                    sql.literal(schema.judge_id),
+                    sql.literal(schema.lesson_id),
+                    sql.literal(amount),
+                    sql.literal(score_type, ScoreEntry.score_type.type),
+                    sql.literal(event),
+                )
+                .where(Student.id.in_(students))
+                .order_by(Student.id),
+            )
+            .returning(ScoreEntry.id, *ratings.DELTA_COLUMNS)
+        )
+    ).all()
+    await ratings.apply(db, added=rows)
+
+    awarded = {row.student_id for row in rows}
+    return AwardResult(
+        created=[row.id for row in rows],
+        missing=[
+            i for i in dict.fromkeys(schema.student_ids or ()) if i not in awarded
+        ],
+    )
@@ -1,33 +1,72 @@
-from fastapi import APIRouter, status, Response
+from collections import defaultdict
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query, status, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_pagination import Page
 from fastapi_pagination.ext.async_sqlalchemy import paginate
 import sqlalchemy as sql
+from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 
-from ..database import Group, Student, students_groups_association
+from ..database import (
+    Group,
+    Lesson,
+    ScoreEntry,
+    Student,
+    cached_statement,
+    rating_rollups,
+    student_ratings,
+    students_groups_association,
+)
 from ..schemas import (
     GroupCreate,
+    GroupDashboardOut,
     GroupOut,
     GroupUpdate,
+    HistoryPoint,
+    MembershipAdded,
+    MembershipRemoved,
+    MembershipUpdate,
+    RollupPeriod,
+    ScoreTypeEnum,
     StudentOut,
+    StudentTotals,
 )
-from .. import dependencies as dep
-from . import lessons
+from .. import cache, dependencies as dep, history, idempotency, pagination, rows
+from ..export import ExportFormat, export_response
+from ..live import publish_members
+from ..routing import Route
+from . import leaderboard, lessons, live, scores
 
-router = APIRouter(prefix="/groups", tags=["groups"])
+router = APIRouter(prefix="/groups", tags=["groups"], route_class=Route)
 
 
 @router.get("/", response_model=Page[GroupOut])
+@cache.cached("groups")
 async def get_all_groups(db: dep.DB):
     return await paginate(db, sql.select(Group))
 
 
+@router.get("/cursor", response_model=pagination.CursorPage[GroupOut])
+@cache.cached("groups")
+async def get_all_groups_cursor(params: pagination.CursorParams, db: dep.DB):
+    return rows.RowsResponse(
+        await pagination.paginate(
+            db, rows.select(Group, GroupOut), params, Group.id, rows=True
+        )
+    )
+
+
 @router.post("/", response_model=GroupOut)
+@idempotency.idempotent()
 async def create_group(schema: GroupCreate, db: dep.DB):
     resp = await db.execute(sql.insert(Group).values(**schema.dict()).returning(Group))
+    cache.invalidate(db, "groups")
     return resp.scalar()
 
 
-group_router = APIRouter()
+group_router = APIRouter(route_class=Route)
 
 
 @group_router.patch("/", response_model=GroupOut)
@@ -38,41 +77,228 @@ async def update_group(group: dep.exists.Group, schema: GroupUpdate, db: dep.DB)
         .values(**schema.dict(exclude_unset=True))
         .returning(Group)
     )
+    cache.invalidate(db, "groups")
     return resp.scalar()
 
 
+@group_router.get("/dashboard", response_model=GroupDashboardOut)
+async def get_group_dashboard(
+    group_id: int,
+    period: scores.CreatedBetween,
+    db: dep.DB,
+    recent: int = Query(10, ge=0, le=100),
+):
+    group = (
+        await db.execute(
+            sql.select(Group)
+            .where(Group.id == group_id)
+            .options(orm.joinedload(Group.teacher), orm.selectinload(Group.students))
+        )
+    ).scalar()
+    if group is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "group with such id does not exists"
+        )
+
+    recent_lessons = (
+        await db.execute(
+            sql.select(Lesson)
+            .where(Lesson.group_id == group_id)
+            .order_by(Lesson.starts_at.desc())
+            .limit(recent)
+        )
+    ).scalars()
+
+    totals = defaultdict(dict)
+    for student_id, score_type, total in await db.execute(
+        sql.select(
+            ScoreEntry.student_id,
+            ScoreEntry.score_type,
+            sql.func.sum(ScoreEntry.amount),
+        )
+        .join(Lesson, Lesson.id == ScoreEntry.lesson_id)
+        .where(Lesson.group_id == group_id, period.clause)
+        .group_by(ScoreEntry.student_id, ScoreEntry.score_type)
+    ):
+        totals[student_id][score_type] = total
+
+    return GroupDashboardOut(
+        **GroupOut.from_orm(group).dict(),
+        teacher=group.teacher,
+        students=group.students,
+        recent_lessons=list(recent_lessons),
+        totals=[
+            StudentTotals(student_id=student.id, totals=totals.get(student.id, {}))
+            for student in group.students
+        ],
+    )
+
+
 @group_router.get("/students", response_model=list[StudentOut])
+@cache.cached("students", "group:{group_id}:members")
 async def get_group_students(group: dep.exists.Group, db: dep.DB):
-    resp = await db.execute(
-        sql.select(Student).where(Student.groups.any(Group.id == group))
+    query = cached_statement(
+        "group_students",
+        lambda: rows.select(Student, StudentOut).where(
+            Student.id.in_(
+                sql.select(students_groups_association.c.student_id).where(
+                    students_groups_association.c.group_id == sql.bindparam("group_id")
+                )
+            )
+        ),
+    )
+    return rows.RowsResponse(await rows.fetch(db, query, {"group_id": group}))
+
+
+async def _existing_students(db: dep.DB, student_ids: list[int]) -> set[int]:
+    query = cached_statement(
+        "existing_students",
+        lambda: sql.select(Student.id).where(
+            Student.id.in_(sql.bindparam("student_ids", expanding=True))
+        ),
+    )
+    return set((await db.execute(query, {"student_ids": student_ids})).scalars())
+
+
+@group_router.put("/students", response_model=MembershipAdded)
+async def add_students_to_group(
+    group: dep.exists.Group, schema: MembershipUpdate, db: dep.DB
+):
+    student_ids = list(dict.fromkeys(schema.student_ids))
+    existing = await _existing_students(db, student_ids)
+    added = set()
+    if existing:
+        added = set(
+            (
+                await db.execute(
+                    postgresql.insert(students_groups_association)
+                    .values(
+                        [
+                            {"group_id": group, "student_id": student_id}
+                            for student_id in existing
+                        ]
+                    )
+                    .on_conflict_do_nothing()
+                    .returning(students_groups_association.c.student_id)
+                )
+            ).scalars()
+        )
+    if added:
+        await publish_members(db, group, added=added)
+        cache.invalidate(db, f"group:{group}:members")
+    return MembershipAdded(
+        added=[i for i in student_ids if i in added],
+        already_present=[i for i in student_ids if i in existing and i not in added],
+        missing=[i for i in student_ids if i not in existing],
+    )
+
+
+@group_router.delete("/students", response_model=MembershipRemoved)
+async def remove_students_from_group(
+    group: dep.exists.Group, schema: MembershipUpdate, db: dep.DB
+):
+    student_ids = list(dict.fromkeys(schema.student_ids))
+    existing = await _existing_students(db, student_ids)
+    removed = set()
+    if existing:
+        removed = set(
+            (
+                await db.execute(
+                    sql.delete(students_groups_association)
+                    .where(students_groups_association.c.group_id == group)
+                    .where(students_groups_association.c.student_id.in_(existing))
+                    .returning(students_groups_association.c.student_id)
+                )
+            ).scalars()
+        )
+    if removed:
+        await publish_members(db, group, removed=removed)
+        cache.invalidate(db, f"group:{group}:members")
+    return MembershipRemoved(
+        removed=[i for i in student_ids if i in removed],
+        not_present=[i for i in student_ids if i in existing and i not in removed],
+        missing=[i for i in student_ids if i not in existing],
     )
-    return resp.scalars().all()
 
 
 @group_router.put("/students/{student_id}")
 async def add_student_to_group(
     group: dep.exists.Group, student: dep.exists.Student, db: dep.DB
 ):
-    if await db.execute(
-        sql.select(Student)
-        .where(Student.groups.any(Group.id == group))
-        .where(Student.id == student)
-    ):
-        return Response(
-            {"detail": "Student already in the group"},
-            status.HTTP_204_NO_CONTENT,
-        )
+    query = cached_statement(
+        "group_member",
+        lambda: sql.select(students_groups_association.c.student_id).where(
+            students_groups_association.c.group_id == sql.bindparam("group_id"),
+            students_groups_association.c.student_id == sql.bindparam("student_id"),
+        ),
+    )
+    if (
+        await db.execute(query, {"group_id": group, "student_id": student})
+    ).scalar() is not None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     await db.execute(
         sql.insert(students_groups_association).values(
             group_id=group, student_id=student
         )
     )
-    return Response(
+    await publish_members(db, group, added=[student])
+    cache.invalidate(db, f"group:{group}:members")
+    return JSONResponse(
         {"detail": "Student added to the group"},
         status.HTTP_201_CREATED,
     )
 
 
+@group_router.get("/rating/export", response_class=StreamingResponse)
+async def export_group_rating(
+    group: dep.exists.Group, db: dep.DB, format: ExportFormat = ExportFormat.csv
+):
+    return export_response(
+        db,
+        sql.select(
+            Student.id.label("student_id"),
+            Student.lastname,
+            Student.firstname,
+            student_ratings.c.score_type,
+            student_ratings.c.total,
+            student_ratings.c.entries,
+        )
+        .join(student_ratings, student_ratings.c.student_id == Student.id)
+        .where(Student.groups.any(Group.id == group))
+        .order_by(Student.lastname, Student.firstname, Student.id),
+        format,
+        f"group-{group}-rating",
+    )
+
+
+@group_router.get("/rating/history", response_model=list[HistoryPoint])
+async def get_group_rating_history(
+    group: dep.exists.Group,
+    db: dep.DB,
+    period: RollupPeriod = RollupPeriod.week,
+    score_type: ScoreTypeEnum | None = None,
+    since: date | None = None,
+    until: date | None = None,
+):
+    return await history.get_history(
+        db,
+        rating_rollups.c.student_id.in_(
+            sql.select(students_groups_association.c.student_id).where(
+                students_groups_association.c.group_id == group
+            )
+        ),
+        period,
+        score_type,
+        since,
+        until,
+    )
+
+
+group_router.include_router(scores.group_router, prefix="/scores", tags=["scores"])
+group_router.include_router(
+    leaderboard.group_router, prefix="/leaderboard", tags=["leaderboard"]
+)
+group_router.include_router(live.router, tags=["live"])
 group_router.include_router(lessons.router, prefix="/lessons", tags=["lessons"])
 router.include_router(group_router, prefix="/{group_id}")
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+
+from ..leaderboard import board, ranked_between
+from ..schemas import LeaderboardEntry, LeaderboardOut, ScoreTypeEnum
+from .. import dependencies as dep
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+
+class _LeaderboardQuery:
+    def __init__(
+        self,
+        score_type: ScoreTypeEnum | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        student_id: int | None = None,
+        radius: Annotated[int, Query(ge=0, le=10)] = 1,
+        limit: Annotated[int, Query(ge=1, le=100)] = 10,
+        offset: Annotated[int, Query(ge=0)] = 0,
+    ):
+        self.score_type = score_type
+        self.since = since
+        self.until = until
+        self.student_id = student_id
+        self.radius = radius
+        self.limit = limit
+        self.offset = offset
+
+
+LeaderboardQuery = Annotated[_LeaderboardQuery, Depends()]
+
+
+async def build_leaderboard(
+    db: dep.DB, group_id: int | None, query: _LeaderboardQuery
+) -> LeaderboardOut:
+    neighbours = []
+    if query.since is None and query.until is None:
+        index = board.index(group_id, query.score_type)
+        size = len(index)
+        entries = index.slice(query.offset, query.offset + query.limit)
+        if query.student_id is not None:
+            position = index.position(query.student_id)
+            if position is not None:
+                neighbours = index.slice(
+                    position - query.radius, position + query.radius + 1
+                )
+    else:
+        ranked = await ranked_between(
+            db, group_id, query.score_type, query.since, query.until
+        )
+        size = len(ranked)
+        entries = ranked[query.offset : query.offset + query.limit]
+        for position, (_, student_id, _) in enumerate(ranked):
+            if student_id == query.student_id:
+                neighbours = ranked[
+                    max(position - query.radius, 0) : position + query.radius + 1
+                ]
+                break
+
+    def to_schema(rows):
+        return [
+            LeaderboardEntry(rank=rank, student_id=student_id, total=total)
+            for rank, student_id, total in rows
+        ]
+
+    return LeaderboardOut(
+        size=size, entries=to_schema(entries), neighbours=to_schema(neighbours)
+    )
+
+
+@router.get("/", response_model=LeaderboardOut)
+async def get_leaderboard(query: LeaderboardQuery, db: dep.DB):
+    return await build_leaderboard(db, None, query)
+
+
+# groups/{group_id}/leaderboard
+group_router = APIRouter()
+
+
+@group_router.get("/", response_model=LeaderboardOut)
+async def get_group_leaderboard(
+    group: dep.exists.Group, query: LeaderboardQuery, db: dep.DB
+):
+    return await build_leaderboard(db, group, query)
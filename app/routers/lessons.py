@@ -9,23 +9,44 @@ from ..schemas import (
     LessonOut,
     LessonUpdate,
 )
-from .. import dependencies as dep
+from .. import cache, dependencies as dep, idempotency, pagination, rows
+from ..routing import Route
+from . import scores
 
-router = APIRouter()
+router = APIRouter(route_class=Route)
 
 
 @router.get("/", response_model=Page[LessonOut])
+@cache.cached("group:{group_id}:lessons")
 async def get_all_group_lessons(group: dep.exists.Group, db: dep.DB):
-    return paginate(db, sql.select(Lesson).where(Lesson.group_id == group))
+    return await paginate(db, sql.select(Lesson).where(Lesson.group_id == group))
+
+
+@router.get("/cursor", response_model=pagination.CursorPage[LessonOut])
+@cache.cached("group:{group_id}:lessons")
+async def get_all_group_lessons_cursor(
+    group: dep.exists.Group, params: pagination.CursorParams, db: dep.DB
+):
+    return rows.RowsResponse(
+        await pagination.paginate(
+            db,
+            rows.select(Lesson, LessonOut).where(Lesson.group_id == group),
+            params,
+            Lesson.id,
+            rows=True,
+        )
+    )
 
 
 @router.post("/", response_model=LessonOut)
+@idempotency.idempotent()
 async def create_group_lesson(
     group: dep.exists.Group, schema: LessonCreate, db: dep.DB
 ):
     resp = await db.execute(
-        sql.insert(Lesson).values(**schema.dict(), group_id=group).returning(Lesson)
+        sql.insert(Lesson).values(schema.dict() | {"group_id": group}).returning(Lesson)
     )
+    cache.invalidate(db, f"group:{group}:lessons")
     return resp.scalar()
 
 
@@ -33,11 +54,14 @@ async def create_group_lesson(
 async def update_group_lesson(
     group: dep.exists.Group, lesson: dep.exists.Lesson, schema: LessonUpdate, db: dep.DB
 ):
+    changes = schema.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "nothing to update")
     new_lesson = (
         await db.execute(
             sql.update(Lesson)
-            .where(Lesson.group_id == group & Lesson.id == lesson)
-            .values(**schema.dict())
+            .where(Lesson.group_id == group, Lesson.id == lesson)
+            .values(**changes)
             .returning(Lesson)
         )
     ).scalar()
@@ -46,4 +70,12 @@ async def update_group_lesson(
             status.HTTP_404_NOT_FOUND,
             "lesson with such id does not exists in this group",
         )
+    cache.invalidate(
+        db, f"group:{group}:lessons", f"group:{new_lesson.group_id}:lessons"
+    )
     return new_lesson
+
+
+router.include_router(
+    scores.lesson_router, prefix="/{lesson_id}/scores", tags=["scores"]
+)
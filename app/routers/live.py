@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, WebSocket, status
+from fastapi.responses import StreamingResponse
+import sqlalchemy as sql
+
+from ..config import settings
+from ..database import Group, cached_statement, read_session_factory
+from ..live import hub
+from .. import dependencies as dep
+
+# groups/{group_id}/live
+router = APIRouter()
+
+_KEEPALIVE = 15
+
+
+async def _group_exists(group_id: int) -> bool:
+    # long-lived streams must not hold a request-scoped session open
+    if ("group", group_id) in dep.existing_ids:
+        return True
+    async with read_session_factory() as db:
+        query = cached_statement(
+            "group_exists",
+            lambda: sql.select(Group.id).where(Group.id == sql.bindparam("group_id")),
+        )
+        found = (await db.execute(query, {"group_id": group_id})).scalar() is not None
+    if found:
+        dep.existing_ids.add(("group", group_id))
+    return found
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/live")
+async def group_live(websocket: WebSocket, group_id: int):
+    if not await _group_exists(group_id):
+        await websocket.close(status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    with hub.subscribe(group_id) as subscription:
+        disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+        try:
+            while not disconnected.done():
+                batch = await subscription.next_batch(
+                    settings.live_coalesce_window, timeout=1
+                )
+                if batch is not None:
+                    await websocket.send_json(batch)
+        finally:
+            disconnected.cancel()
+
+
+@router.get("/live/sse", response_class=StreamingResponse)
+async def group_live_sse(group_id: int):
+    if not await _group_exists(group_id):
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "group with such id does not exists"
+        )
+
+    async def events():
+        with hub.subscribe(group_id) as subscription:
+            while True:
+                batch = await subscription.next_batch(
+                    settings.live_coalesce_window, timeout=_KEEPALIVE
+                )
+                if batch is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"data: {json.dumps(batch)}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
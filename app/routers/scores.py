@@ -1,32 +1,424 @@
-from fastapi import APIRouter, status, HTTPException
+import csv
+from datetime import date
+import io
+import json
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import Page
 from fastapi_pagination.ext.async_sqlalchemy import paginate
+from pydantic import ValidationError
 import sqlalchemy as sql
 
-from ..database import ScoreEntry
+from ..database import Event, Lesson, ScoreEntry, Student
 from ..schemas import (
+    BulkRowError,
+    BulkScoreResult,
     ScoreEntryCreate,
     ScoreEntryOut,
     ScoreEntryUpdate,
 )
-from .. import dependencies as dep
+from .. import (
+    cache,
+    dependencies as dep,
+    history,
+    idempotency,
+    pagination,
+    ratings,
+    rows,
+)
+from ..writebehind import writer
+from ..export import ExportFormat, export_response
+from ..routing import Route
+
+_export_columns = (
+    ScoreEntry.id,
+    ScoreEntry.created_at,
+    ScoreEntry.student_id,
+    ScoreEntry.judge_id,
+    ScoreEntry.lesson_id,
+    ScoreEntry.event_id,
+    ScoreEntry.score_type,
+    ScoreEntry.amount,
+)
+
+
+class _CreatedBetween:
+    """`since <= created_at < until`, the current term unless `since` is given.
+
+    score_entries is partitioned by month, so the bound lets Postgres skip
+    every partition outside it.
+    """
+
+    def __init__(self, since: date | None = None, until: date | None = None):
+        self.since = since or history.term_start(date.today())
+        self.until = until
+
+    @property
+    def clause(self) -> sql.ColumnElement:
+        clause = ScoreEntry.created_at >= self.since
+        if self.until is not None:
+            clause &= ScoreEntry.created_at < self.until
+        return clause
+
+
+CreatedBetween = Annotated[_CreatedBetween, Depends()]
+
+# foreign keys of a score entry, by the `dep.existing_ids` name of their target
+_references = {
+    "student_id": "student",
+    "judge_id": "student",
+    "event_id": "event",
+    "lesson_id": "lesson",
+}
+_referenced_models = {"student": Student, "event": Event, "lesson": Lesson}
+
+
+async def _check_references(db: dep.DB, values: dict):
+    """422 for an id in `values` that points nowhere, instead of the
+    IntegrityError writing it would raise."""
+    keys = {
+        field: (name, values[field])
+        for field, name in _references.items()
+        if values.get(field) is not None
+    }
+    pending = {key for key in keys.values() if key not in dep.existing_ids}
+    if not pending:
+        return
+    found = {
+        tuple(row)
+        for row in await db.execute(
+            sql.union_all(
+                *(
+                    sql.select(sql.literal(name), _referenced_models[name].id).where(
+                        _referenced_models[name].id == item_id
+                    )
+                    for name, item_id in pending
+                )
+            )
+        )
+    }
+    for key in found:
+        dep.existing_ids.add(key)
+    missing = pending - found
+    for field, key in keys.items():
+        if key in missing:
+            raise HTTPException(
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+                f"{field} {key[1]} does not exists",
+            )
+
 
 # students/{student}/scores
-student_router = APIRouter()
+student_router = APIRouter(route_class=Route)
 
 
 @student_router.get("/", response_model=Page[ScoreEntryOut])
-async def get_all_student_scores(student: dep.exists.Student, db: dep.DB):
+@cache.cached("student:{student_id}:scores")
+async def get_all_student_scores(
+    student: dep.exists.Student, period: CreatedBetween, db: dep.DB
+):
     return await paginate(
-        db, sql.select(ScoreEntry).where(ScoreEntry.student_id == student)
+        db,
+        sql.select(ScoreEntry).where(ScoreEntry.student_id == student, period.clause),
+    )
+
+
+@student_router.get("/cursor", response_model=pagination.CursorPage[ScoreEntryOut])
+@cache.cached("student:{student_id}:scores")
+async def get_all_student_scores_cursor(
+    student: dep.exists.Student,
+    params: pagination.CursorParams,
+    period: CreatedBetween,
+    db: dep.DB,
+):
+    return rows.RowsResponse(
+        await pagination.paginate(
+            db,
+            rows.select(ScoreEntry, ScoreEntryOut).where(
+                ScoreEntry.student_id == student, period.clause
+            ),
+            params,
+            ScoreEntry.id,
+            rows=True,
+        )
     )
 
 
 @student_router.get("/judged", response_model=Page[ScoreEntryOut])
-async def get_all_student_judged_scores(student: dep.exists.Student, db: dep.DB):
+@cache.cached("student:{student_id}:judged")
+async def get_all_student_judged_scores(
+    student: dep.exists.Student, period: CreatedBetween, db: dep.DB
+):
     return await paginate(
-        db, sql.select(ScoreEntry).where(ScoreEntry.judge_id == student)
+        db,
+        sql.select(ScoreEntry).where(ScoreEntry.judge_id == student, period.clause),
+    )
+
+
+@student_router.get(
+    "/judged/cursor", response_model=pagination.CursorPage[ScoreEntryOut]
+)
+@cache.cached("student:{student_id}:judged")
+async def get_all_student_judged_scores_cursor(
+    student: dep.exists.Student,
+    params: pagination.CursorParams,
+    period: CreatedBetween,
+    db: dep.DB,
+):
+    return rows.RowsResponse(
+        await pagination.paginate(
+            db,
+            rows.select(ScoreEntry, ScoreEntryOut).where(
+                ScoreEntry.judge_id == student, period.clause
+            ),
+            params,
+            ScoreEntry.id,
+            rows=True,
+        )
+    )
+
+
+@student_router.get("/export", response_class=StreamingResponse)
+async def export_student_scores(
+    student: dep.exists.Student,
+    period: CreatedBetween,
+    db: dep.DB,
+    format: ExportFormat = ExportFormat.csv,
+):
+    return export_response(
+        db,
+        sql.select(*_export_columns)
+        .where(ScoreEntry.student_id == student, period.clause)
+        .order_by(ScoreEntry.id),
+        format,
+        f"student-{student}-scores",
+    )
+
+
+# groups/{group_id}/scores
+group_router = APIRouter(route_class=Route)
+
+
+@group_router.get("/export", response_class=StreamingResponse)
+async def export_group_scores(
+    group: dep.exists.Group,
+    period: CreatedBetween,
+    db: dep.DB,
+    format: ExportFormat = ExportFormat.csv,
+):
+    return export_response(
+        db,
+        sql.select(*_export_columns)
+        .join(Lesson, Lesson.id == ScoreEntry.lesson_id)
+        .where(Lesson.group_id == group, period.clause)
+        .order_by(ScoreEntry.id),
+        format,
+        f"group-{group}-scores",
     )
 
 
 # groups/{group_id}/students/{student_id}/scores
+
+
+# groups/{group_id}/lessons/{lesson_id}/scores
+lesson_router = APIRouter(route_class=Route)
+
+
+@lesson_router.post(
+    "/",
+    response_model=ScoreEntryOut,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Queued for writing"}},
+)
+@idempotency.idempotent()
+async def create_score(
+    group: dep.exists.Group,
+    lesson: dep.exists.Lesson,
+    schema: ScoreEntryCreate,
+    request: Request,
+    db: dep.DB,
+):
+    await _check_references(db, schema.dict(exclude={"lesson_id"}))
+    values = {**schema.dict(), "lesson_id": lesson}
+    # a keyed create must commit in the same transaction as its key
+    if writer.enabled and not idempotency.keyed(request):
+        # hand the connection back: flushers need the pool while this waits on them
+        await db.commit()
+        entry = await writer.submit(values)
+        if entry is None:
+            return Response(status_code=status.HTTP_202_ACCEPTED)
+        return entry
+
+    entry = (
+        await db.execute(sql.insert(ScoreEntry).values(**values).returning(ScoreEntry))
+    ).scalar()
+    await ratings.apply(db, added=[entry])
+    return entry
+
+
+@lesson_router.patch("/{score_id}", response_model=ScoreEntryOut)
+async def update_score(
+    group: dep.exists.Group,
+    lesson: dep.exists.Lesson,
+    score_id: int,
+    schema: ScoreEntryUpdate,
+    db: dep.DB,
+):
+    changes = schema.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "nothing to update")
+    await _check_references(db, changes)
+    old_entry = (
+        await db.execute(
+            sql.select(*ratings.DELTA_COLUMNS)
+            .where(ScoreEntry.id == score_id, ScoreEntry.lesson_id == lesson)
+            .with_for_update()
+        )
+    ).one_or_none()
+    if old_entry is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            "score with such id does not exists in this lesson",
+        )
+
+    entry = (
+        await db.execute(
+            sql.update(ScoreEntry)
+            .where(ScoreEntry.id == score_id)
+            .values(**changes)
+            .returning(ScoreEntry)
+        )
+    ).scalar()
+    await ratings.apply(db, added=[entry], removed=[old_entry])
+    return entry
+
+
+@lesson_router.delete("/{score_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_score(
+    group: dep.exists.Group, lesson: dep.exists.Lesson, score_id: int, db: dep.DB
+):
+    old_entry = (
+        await db.execute(
+            sql.delete(ScoreEntry)
+            .where(ScoreEntry.id == score_id, ScoreEntry.lesson_id == lesson)
+            .returning(*ratings.DELTA_COLUMNS)
+        )
+    ).one_or_none()
+    if old_entry is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            "score with such id does not exists in this lesson",
+        )
+
+    await ratings.apply(db, removed=[old_entry])
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _read_bulk_rows(request: Request) -> list[dict]:
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            return [
+                {key: value or None for key, value in row.items()}
+                for row in csv.DictReader(io.StringIO(body.decode()))
+            ]
+        rows = json.loads(body)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"malformed body: {e}")
+    if not isinstance(rows, list):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "expected a list of scores")
+    return rows
+
+
+async def _existing_ids(
+    db: dep.DB, student_ids: set[int], event_ids: set[int]
+) -> tuple[set[int], set[int]]:
+    resp = await db.execute(
+        sql.union_all(
+            sql.select(sql.literal("student"), Student.id).where(
+                Student.id.in_(student_ids)
+            ),
+            sql.select(sql.literal("event"), Event.id).where(Event.id.in_(event_ids)),
+        )
+    )
+    found = {"student": set(), "event": set()}
+    for kind, item_id in resp:
+        found[kind].add(item_id)
+    return found["student"], found["event"]
+
+
+@lesson_router.post(
+    ":bulk",
+    response_model=BulkScoreResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/ScoreEntryCreate"},
+                    }
+                },
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def create_scores_bulk(
+    group: dep.exists.Group, lesson: dep.exists.Lesson, request: Request, db: dep.DB
+):
+    errors = []
+    entries: dict[int, ScoreEntryCreate] = {}
+    for row_number, row in enumerate(await _read_bulk_rows(request)):
+        try:
+            entries[row_number] = ScoreEntryCreate.parse_obj(
+                {**row, "lesson_id": lesson}
+            )
+        except ValidationError as e:
+            detail = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in e.errors()
+            )
+            errors.append(BulkRowError(row=row_number, detail=detail))
+        except TypeError:
+            errors.append(BulkRowError(row=row_number, detail="expected an object"))
+
+    students, events = await _existing_ids(
+        db,
+        {e.student_id for e in entries.values()}
+        | {e.judge_id for e in entries.values()},
+        {e.event_id for e in entries.values()},
+    )
+    for row_number, entry in list(entries.items()):
+        for field, known in (
+            ("student_id", students),
+            ("judge_id", students),
+            ("event_id", events),
+        ):
+            if getattr(entry, field) not in known:
+                errors.append(
+                    BulkRowError(
+                        row=row_number,
+                        detail=f"{field} {getattr(entry, field)} does not exists",
+                    )
+                )
+                del entries[row_number]
+                break
+
+    created = []
+    if entries:
+        rows = (
+            await db.execute(
+                sql.insert(ScoreEntry).returning(
+                    ScoreEntry.id, *ratings.DELTA_COLUMNS, sort_by_parameter_order=True
+                ),
+                [entry.dict() for entry in entries.values()],
+            )
+        ).all()
+        created = [row.id for row in rows]
+        await ratings.apply(db, added=rows)
+
+    errors.sort(key=lambda error: error.row)
+    return BulkScoreResult(created=created, errors=errors)
@@ -1,27 +1,92 @@
-from fastapi import APIRouter
+from datetime import date
+from typing import Annotated
+
+from fastapi import APIRouter, Query
 from fastapi_pagination import Page
 from fastapi_pagination.ext.async_sqlalchemy import paginate
 import sqlalchemy as sql
 
-from ..database import Student
-from ..schemas import StudentCreate, StudentOut, StudentUpdate
-from .. import dependencies as dep
+from ..config import settings
+from ..database import Student, rating_rollups
+from ..schemas import (
+    HistoryPoint,
+    RatingOut,
+    RollupPeriod,
+    ScoreTypeEnum,
+    StudentCreate,
+    StudentMatch,
+    StudentOut,
+    StudentUpdate,
+)
+from .. import (
+    cache,
+    dependencies as dep,
+    history,
+    idempotency,
+    pagination,
+    ratings,
+    rows,
+    search,
+)
+from ..routing import Route
 from . import scores
 
-router = APIRouter(prefix="/students", tags=["students"])
+router = APIRouter(prefix="/students", tags=["students"], route_class=Route)
 
 
 @router.get("/", response_model=Page[StudentOut])
+@cache.cached("students")
 async def get_all_students(db: dep.DB):
     return await paginate(db, sql.select(Student))
 
 
+@router.get("/cursor", response_model=pagination.CursorPage[StudentOut])
+@cache.cached("students")
+async def get_all_students_cursor(params: pagination.CursorParams, db: dep.DB):
+    return rows.RowsResponse(
+        await pagination.paginate(
+            db, rows.select(Student, StudentOut), params, Student.id, rows=True
+        )
+    )
+
+
+@router.get("/search", response_model=list[StudentMatch])
+async def search_students(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    db: dep.DB,
+    group_id: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+):
+    found = []
+    if settings.student_search_index:
+        found = search.names.search(q, limit, group_id)
+        if len(found) == limit:
+            return rows.RowsResponse([_match(*student) for student in found])
+    found += await search.query(
+        db, q, limit - len(found), group_id, {student[0] for student in found}
+    )
+    return rows.RowsResponse([_match(*student) for student in found])
+
+
+def _match(student_id: int, firstname: str, lastname: str) -> dict:
+    return {"firstname": firstname, "lastname": lastname, "id": student_id}
+
+
+async def _index_name(db: dep.DB, student: Student):
+    if settings.student_search_index:
+        await search.index(db, student.id, student.firstname, student.lastname)
+
+
 @router.post("/", response_model=StudentOut)
+@idempotency.idempotent()
 async def create_student(schema: StudentCreate, db: dep.DB):
     resp = await db.execute(
         sql.insert(Student).values(**schema.dict()).returning(Student)
     )
-    return resp.scalar()
+    student = resp.scalar()
+    cache.invalidate(db, "students")
+    await _index_name(db, student)
+    return student
 
 
 @router.patch("/{student_id}", response_model=StudentOut)
@@ -34,7 +99,36 @@ async def update_student(
         .values(**schema.dict(exclude_unset=True), updated_at=sql.func.now())
         .returning(Student)
     )
-    return resp.scalar()
+    student = resp.scalar()
+    cache.invalidate(db, "students")
+    await _index_name(db, student)
+    return student
+
+
+@router.get("/{student_id}/rating", response_model=list[RatingOut])
+@cache.cached("student:{student_id}:scores")
+async def get_student_rating(student: dep.exists.Student, db: dep.DB):
+    return await ratings.get_student_ratings(db, student)
+
+
+@router.get("/{student_id}/rating/history", response_model=list[HistoryPoint])
+@cache.cached("student:{student_id}:scores")
+async def get_student_rating_history(
+    student: dep.exists.Student,
+    db: dep.DB,
+    period: RollupPeriod = RollupPeriod.week,
+    score_type: ScoreTypeEnum | None = None,
+    since: date | None = None,
+    until: date | None = None,
+):
+    return await history.get_history(
+        db,
+        rating_rollups.c.student_id == student,
+        period,
+        score_type,
+        since,
+        until,
+    )
 
 
 router.include_router(scores.student_router, prefix="/{student_id}/scores")
@@ -0,0 +1,28 @@
+from typing import Callable
+
+from fastapi.routing import APIRoute
+
+Handler = Callable
+RouteWrapper = Callable[[APIRoute, Handler], Handler]
+
+
+class Route(APIRoute):
+    """APIRoute whose request handler can be wrapped by endpoint decorators.
+
+    Wrappers run before dependency resolution, so they can answer a request
+    without opening a database session.
+    """
+
+    def get_route_handler(self) -> Handler:
+        handler = super().get_route_handler()
+        for wrapper in getattr(self.endpoint, "route_wrappers", ()):
+            handler = wrapper(self, handler)
+        return handler
+
+
+def wrap_route(wrapper: RouteWrapper):
+    def decorator(endpoint):
+        endpoint.route_wrappers = (*getattr(endpoint, "route_wrappers", ()), wrapper)
+        return endpoint
+
+    return decorator
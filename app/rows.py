@@ -0,0 +1,40 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import Base
+from .utils import plain
+
+
+def select(model: type[Base], schema: type[BaseModel]) -> sql.Select:
+    """Select exactly the columns `schema` serializes, in its field order.
+
+    Column rows skip the identity map, and together with `RowsResponse` also
+    skip `from_orm` and `response_model` validation.
+    """
+    return sql.select(*(getattr(model, name) for name in schema.__fields__))
+
+
+async def fetch(
+    db: AsyncSession, query: sql.Select, params: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    return [row._asdict() for row in await db.execute(query, params)]
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return dict(value)
+    return plain(value)
+
+
+class RowsResponse(JSONResponse):
+    """JSON of plain rows, trusted as is; keep `response_model` on the route for docs."""
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
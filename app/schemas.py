@@ -1,7 +1,11 @@
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conint
+
+# what fits the int4 columns; anything bigger fails in the driver, not here
+Id = conint(ge=1, le=2**31 - 1)
+Int32 = conint(ge=-(2**31), le=2**31 - 1)
 
 
 class ScoreTypeEnum(Enum):
@@ -17,6 +21,18 @@ class ScoreTypeEnum(Enum):
     competitions = "competitions"
 
 
+class RollupPeriod(Enum):
+    day = "day"
+    week = "week"
+    term = "term"
+
+
+class FlagKind(Enum):
+    self_judging = "self_judging"
+    reciprocal = "reciprocal"
+    burst = "burst"
+
+
 class Base(BaseModel):
     class Config:
         orm_mode = True
@@ -43,6 +59,10 @@ class StudentOut(_BaseStudent, TimestampMixin):
     id: int
 
 
+class StudentMatch(_BaseStudent):
+    id: int
+
+
 class StudentUpdate(Base):
     firstname: str | None
     lastname: str | None
@@ -90,12 +110,12 @@ class LessonUpdate(Base):
 
 
 class _BaseScoreEntry(Base):
-    student_id: int
-    judge_id: int
-    lesson_id: int
-    amount: int
+    student_id: Id
+    judge_id: Id
+    lesson_id: Id
+    amount: Int32
     score_type: ScoreTypeEnum
-    event_id: int
+    event_id: Id
 
 
 class ScoreEntryCreate(_BaseScoreEntry):
@@ -107,9 +127,118 @@ class ScoreEntryOut(_BaseScoreEntry, CreatedAtMixin):
 
 
 class ScoreEntryUpdate(Base):
-    student_id: int | None
-    judge_id: int | None
-    lesson_id: int | None
-    amount: int | None
+    student_id: Id | None
+    judge_id: Id | None
+    lesson_id: Id | None
+    amount: Int32 | None
+    score_type: ScoreTypeEnum | None
+    event_id: Id | None
+
+
+class RatingOut(Base):
+    score_type: ScoreTypeEnum
+    total: int
+    entries: int
+
+
+class LeaderboardEntry(Base):
+    rank: int
+    student_id: int
+    total: int
+
+
+class LeaderboardOut(Base):
+    size: int
+    entries: list[LeaderboardEntry]
+    neighbours: list[LeaderboardEntry]
+
+
+class BulkRowError(Base):
+    row: int
+    detail: str
+
+
+class BulkScoreResult(Base):
+    created: list[int]
+    errors: list[BulkRowError]
+
+
+class StudentTotals(Base):
+    student_id: int
+    totals: dict[ScoreTypeEnum, int]
+
+
+class GroupDashboardOut(GroupOut):
+    teacher: StudentOut
+    students: list[StudentOut]
+    recent_lessons: list[LessonOut]
+    totals: list[StudentTotals]
+
+
+class HistoryPoint(Base):
+    bucket: date
+    score_type: ScoreTypeEnum
+    total: int
+    cumulative: int
+
+
+class MembershipUpdate(Base):
+    student_ids: list[Id]
+
+
+class MembershipAdded(Base):
+    added: list[int]
+    already_present: list[int]
+    missing: list[int]
+
+
+class MembershipRemoved(Base):
+    removed: list[int]
+    not_present: list[int]
+    missing: list[int]
+
+
+class EventAward(Base):
+    lesson_id: Id
+    judge_id: Id
+    # defaults to the event's base_amount and the group's default_score_type
+    amount: Int32 | None
     score_type: ScoreTypeEnum | None
-    event_id: int | None
+    # None awards every member of the lesson's group
+    student_ids: list[Id] | None
+
+
+class AwardResult(Base):
+    created: list[int]
+    missing: list[int]
+
+
+class ScoreTypePercentiles(Base):
+    score_type: ScoreTypeEnum
+    students: int
+    mean: float
+    # student totals, keyed by percentile
+    percentiles: dict[str, float]
+
+
+class StudentZScore(Base):
+    student_id: int
+    total: int
+    z: float
+
+
+class JudgeBias(Base):
+    judge_id: int
+    entries: int
+    mean_amount: float
+    # mean difference from the average amount of the same score type
+    bias: float
+
+
+class EventUptake(Base):
+    event_id: int
+    base_amount: int | None
+    entries: int
+    students: int
+    mean_amount: float
+    at_base_share: float
@@ -0,0 +1,184 @@
+import asyncio
+from bisect import bisect_left, insort
+import json
+import logging
+import os
+
+import sqlalchemy as sql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import (
+    Student,
+    on_commit,
+    session_factory,
+    students_groups_association,
+)
+from .leaderboard import board
+from .periodic import Periodic
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "ftk_student_names"
+
+# the expression ix_students_name_trgm is built on, keep the two identical
+name = sql.func.lower(Student.firstname + sql.literal_column("' '") + Student.lastname)
+
+
+def tokenize(text: str) -> list[str]:
+    return text.casefold().split()
+
+
+class NameIndex:
+    """Name tokens of every student, sorted, for prefix lookups.
+
+    All tokens sharing a prefix form one contiguous run of the list, which is
+    what a prefix trie would give, at a fraction of its memory. Each worker holds
+    its own copy, kept current by the student endpoints once they commit; other
+    workers' changes come through the NOTIFY bridge with `live_notify`, and
+    otherwise with a reload every `student_search_reload_interval` seconds.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[str, int]] = []
+        self._students: dict[int, tuple[str, str, tuple[str, ...]]] = {}
+
+    def __len__(self):
+        return len(self._students)
+
+    async def load(self, db: AsyncSession):
+        rows = (
+            await db.execute(
+                sql.select(Student.id, Student.firstname, Student.lastname)
+            )
+        ).all()
+        # built off the event loop and swapped in whole
+        self._keys, self._students = await asyncio.to_thread(self._build, rows)
+
+    @staticmethod
+    def _build(rows) -> tuple[list, dict]:
+        keys, students = [], {}
+        for student_id, firstname, lastname in rows:
+            tokens = tuple(tokenize(f"{firstname} {lastname}"))
+            students[student_id] = (firstname, lastname, tokens)
+            keys.extend((token, student_id) for token in set(tokens))
+        keys.sort()
+        return keys, students
+
+    def update(self, student_id: int, firstname: str, lastname: str):
+        self.remove(student_id)
+        tokens = tuple(tokenize(f"{firstname} {lastname}"))
+        self._students[student_id] = (firstname, lastname, tokens)
+        for token in set(tokens):
+            insort(self._keys, (token, student_id))
+
+    def remove(self, student_id: int):
+        student = self._students.pop(student_id, None)
+        if student is not None:
+            for token in set(student[2]):
+                del self._keys[bisect_left(self._keys, (token, student_id))]
+
+    def search(
+        self, query: str, limit: int, group_id: int | None = None
+    ) -> list[tuple[int, str, str]]:
+        """(id, firstname, lastname) of students with a name token starting with
+        every word of `query`, in token order."""
+        words = tokenize(query)
+        if not words:
+            return []
+        # walk the run of the longest word, it is the shortest one
+        lead = max(words, key=len)
+        rest = list(words)
+        rest.remove(lead)
+
+        result, seen = [], set()
+        for i in range(bisect_left(self._keys, (lead,)), len(self._keys)):
+            token, student_id = self._keys[i]
+            if not token.startswith(lead):
+                break
+            if student_id in seen:
+                continue
+            seen.add(student_id)
+            if group_id is not None and group_id not in board.groups_of(student_id):
+                continue
+            firstname, lastname, tokens = self._students[student_id]
+            if all(any(t.startswith(word) for t in tokens) for word in rest):
+                result.append((student_id, firstname, lastname))
+                if len(result) == limit:
+                    break
+        return result
+
+
+async def index(db: AsyncSession, student_id: int, firstname: str, lastname: str):
+    """Put a student's name into the index of every worker once `db` commits."""
+    on_commit(db, lambda: names.update(student_id, firstname, lastname))
+    if settings.live_notify:
+        payload = {"pid": os.getpid(), "student": [student_id, firstname, lastname]}
+        await db.execute(sql.select(sql.func.pg_notify(CHANNEL, json.dumps(payload))))
+
+
+def on_notify(connection, pid, channel, payload: str):
+    try:
+        message = json.loads(payload)
+        student_id, firstname, lastname = message["student"]
+    except (ValueError, KeyError, TypeError):
+        log.warning("ignoring malformed %s payload: %r", CHANNEL, payload)
+        return
+    if message.get("pid") != os.getpid():
+        # our own writes were indexed on commit
+        names.update(student_id, firstname, lastname)
+
+
+def _like_prefix(word: str) -> sql.ColumnElement:
+    word = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return name.like(f"{word}%") | name.like(f"% {word}%")
+
+
+async def query(
+    db: AsyncSession,
+    q: str,
+    limit: int,
+    group_id: int | None = None,
+    exclude: set[int] = frozenset(),
+) -> list[tuple[int, str, str]]:
+    """Prefix matches first, then trigram word-similarity matches, best first.
+
+    Both kinds of condition are served by the pg_trgm GIN index on `name`.
+    """
+    words = tokenize(q)
+    if not words:
+        return []
+    prefix = sql.and_(*map(_like_prefix, words))
+    query_text = " ".join(words)
+    stmt = (
+        sql.select(Student.id, Student.firstname, Student.lastname)
+        .where(prefix | sql.literal(query_text).op("<%")(name))
+        .order_by(
+            prefix.desc(),
+            sql.func.word_similarity(query_text, name).desc(),
+            Student.id,
+        )
+        .limit(limit)
+    )
+    if group_id is not None:
+        stmt = stmt.where(
+            Student.id.in_(
+                sql.select(students_groups_association.c.student_id).where(
+                    students_groups_association.c.group_id == group_id
+                )
+            )
+        )
+    if exclude:
+        stmt = stmt.where(Student.id.not_in(exclude))
+    return [tuple(row) for row in await db.execute(stmt)]
+
+
+names = NameIndex()
+
+
+async def _reload_names():
+    async with session_factory() as db:
+        await names.load(db)
+
+
+reloader = Periodic(_reload_names, lambda: settings.student_search_reload_interval)
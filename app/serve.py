@@ -0,0 +1,99 @@
+"""Run the API in several worker processes.
+
+python -m app.serve --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+
+import asyncpg
+import uvicorn
+
+from .config import settings
+
+
+async def _server_budget() -> int:
+    conn = await asyncpg.connect(settings.database_url.replace("+asyncpg", ""))
+    try:
+        max_connections = int(await conn.fetchval("SHOW max_connections"))
+        reserved = int(await conn.fetchval("SHOW superuser_reserved_connections"))
+    finally:
+        await conn.close()
+    return max_connections - reserved - settings.connection_headroom
+
+
+def pool_limits(budget: int, workers: int) -> tuple[int, int]:
+    """Shrink pool_size/max_overflow so `workers` processes fit in `budget`."""
+    per_worker = budget // workers
+    if settings.live_notify:
+        per_worker -= 1  # the LISTEN connection
+    if settings.anomaly_detection:
+        per_worker -= 1  # the anomaly pipeline's advisory lock connection
+    if settings.read_database_url:
+        per_worker //= 2
+    if per_worker < 1:
+        raise SystemExit(
+            f"{workers} workers do not fit in a budget of {budget} connections"
+        )
+    pool_size = min(settings.pool_size, per_worker)
+    return pool_size, min(settings.max_overflow, per_worker - pool_size)
+
+
+def _apply_pool_limits(pool_size: int, max_overflow: int):
+    # workers are fresh interpreters and read their settings from the environment
+    os.environ["FTK_POOL_SIZE"] = str(pool_size)
+    os.environ["FTK_MAX_OVERFLOW"] = str(max_overflow)
+    settings.pool_size = pool_size
+    settings.max_overflow = max_overflow
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--fast",
+        action=argparse.BooleanOptionalAction,
+        default=_available("uvloop") and _available("httptools"),
+        help="use uvloop and httptools (default: when installed)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=30,
+        help="seconds to let in-flight requests finish on shutdown",
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    args = parser().parse_args(argv)
+    budget = settings.connection_budget or asyncio.run(_server_budget())
+    pool_size, max_overflow = pool_limits(budget, args.workers)
+    _apply_pool_limits(pool_size, max_overflow)
+    print(
+        f"{args.workers} workers, pool_size={pool_size} max_overflow={max_overflow}"
+        f" (budget {budget} connections)"
+    )
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if args.fast else "asyncio",
+        http="httptools" if args.fast else "h11",
+        timeout_graceful_shutdown=args.drain_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
+from datetime import date
+from enum import Enum
+from functools import lru_cache
 import re
 
+_WORD = re.compile("[a-zA-Z][^A-Z]*")
+
+
+@lru_cache(maxsize=None)
 def parse_tablename(name: str) -> str:
-    match = re.findall("[a-zA-Z][^A-Z]*", name)
+    match = _WORD.findall(name)
     if match[-1][-1] == "y":
         match[-1] = match[-1][:-1] + "ies"
     else:
         match[-1] += "s"
-    return "_".join(m.lower() for m in match)
\ No newline at end of file
+    return "_".join(m.lower() for m in match)
+
+
+def plain(value):
+    """`value` as something csv and json write as is."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
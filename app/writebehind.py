@@ -0,0 +1,108 @@
+"""Coalesce single score creates into multi-row INSERTs.
+
+Requests put their row on a queue and, with `score_write_behind = "commit"`,
+wait for the flusher that commits it; with `"queued"` they return as soon as the
+row is queued, and a crash loses whatever has not been flushed yet.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy.engine import Row
+import sqlalchemy as sql
+
+from .config import settings
+from .database import ScoreEntry, session_factory
+from .schemas import ScoreEntryOut
+from . import ratings
+
+log = logging.getLogger(__name__)
+
+_Item = tuple[dict[str, Any], asyncio.Future | None]
+
+
+class ScoreWriter:
+    def __init__(self):
+        self._queue: asyncio.Queue[_Item] | None = None
+        self._flushers: list[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        return settings.score_write_behind != "off"
+
+    def start(self):
+        self._queue = asyncio.Queue(settings.score_batch_queue_size)
+        self._flushers = [
+            asyncio.create_task(self._run())
+            for _ in range(settings.score_batch_flushers)
+        ]
+
+    async def stop(self):
+        if self._queue is not None:
+            await self._queue.join()
+        for task in self._flushers:
+            task.cancel()
+        await asyncio.gather(*self._flushers, return_exceptions=True)
+        self._queue, self._flushers = None, []
+
+    async def submit(self, values: dict[str, Any]) -> Row | None:
+        """Queue one score entry; its row once committed, None in "queued" mode."""
+        if self._queue is None:
+            self.start()
+        future = None
+        if settings.score_write_behind == "commit":
+            future = asyncio.get_running_loop().create_future()
+        # a full queue holds callers back instead of growing without bound
+        await self._queue.put((values, future))
+        return future and await future
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            if queue.qsize() < settings.score_batch_size - 1:
+                await asyncio.sleep(settings.score_batch_delay)
+            while len(batch) < settings.score_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _flush(self, batch: list[_Item]):
+        try:
+            async with session_factory() as db, db.begin():
+                rows = (
+                    await db.execute(
+                        sql.insert(ScoreEntry).returning(
+                            *(
+                                getattr(ScoreEntry, name)
+                                for name in ScoreEntryOut.__fields__
+                            ),
+                            sort_by_parameter_order=True,
+                        ),
+                        [values for values, _ in batch],
+                    )
+                ).all()
+                await ratings.apply(db, added=rows)
+        except Exception as e:
+            if len(batch) > 1:
+                # one bad row fails the whole statement, give each its own answer
+                for item in batch:
+                    await self._flush([item])
+                return
+            values, future = batch[0]
+            if future is None:
+                log.exception("dropped queued score entry %s", values)
+            elif not future.done():
+                future.set_exception(e)
+            return
+
+        for (_, future), row in zip(batch, rows):
+            if future is not None and not future.done():
+                future.set_result(row)
+
+
+writer = ScoreWriter()
@@ -0,0 +1,198 @@
+"""Fill the database with a synthetic school using COPY.
+
+python -m bench.generate --students 50000 --scores 10000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import asyncpg
+
+from app.config import settings
+from app.database import session_factory
+from app.schemas import ScoreTypeEnum
+from app import partitions, ratings
+
+CHUNK = 100_000
+FIRSTNAMES = ["Anna", "Boris", "Vera", "Gleb", "Daria", "Egor", "Zoya", "Ilya"]
+LASTNAMES = ["Ivanova", "Petrov", "Sidorova", "Kuznetsov", "Popova", "Smirnov"]
+
+
+def _chunks(rows: Iterator[tuple]) -> Iterator[list[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _copy(conn: asyncpg.Connection, table: str, columns, rows):
+    started, count = time.perf_counter(), 0
+    for chunk in _chunks(rows):
+        await conn.copy_records_to_table(table, records=chunk, columns=columns)
+        count += len(chunk)
+    print(f"{table:<20} {count:>10} rows in {time.perf_counter() - started:.1f}s")
+
+
+async def _max_id(conn: asyncpg.Connection, table: str) -> int:
+    return await conn.fetchval(f"SELECT coalesce(max(id), 0) FROM {table}")
+
+
+async def generate(args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    term_start = now - timedelta(days=args.days)
+    score_types = [score_type.value for score_type in ScoreTypeEnum]
+
+    # rows COPYed into the default partition would stay there, unpruned
+    async with session_factory() as db, db.begin():
+        await partitions.cover(
+            db, partitions.months_between(term_start.date(), now.date())
+        )
+
+    conn = await asyncpg.connect(settings.database_url.replace("+asyncpg", ""))
+    try:
+        async with conn.transaction():
+            first_student = await _max_id(conn, "students") + 1
+            first_group = await _max_id(conn, "groups") + 1
+            first_lesson = await _max_id(conn, "lessons") + 1
+            first_event = await _max_id(conn, "events") + 1
+            first_score = await _max_id(conn, "score_entries") + 1
+            students = range(first_student, first_student + args.students)
+            groups = range(first_group, first_group + args.groups)
+            lessons = range(first_lesson, first_lesson + args.groups * args.lessons)
+            events = range(first_event, first_event + args.events)
+
+            await _copy(
+                conn,
+                "students",
+                ["id", "firstname", "lastname", "created_at", "updated_at"],
+                (
+                    (i, rng.choice(FIRSTNAMES), rng.choice(LASTNAMES), now, now)
+                    for i in students
+                ),
+            )
+            await _copy(
+                conn,
+                "groups",
+                ["id", "name", "teacher_id", "default_score_type"],
+                (
+                    (i, f"group {i}", rng.choice(students), rng.choice(score_types))
+                    for i in groups
+                ),
+            )
+            members = {
+                group_id: rng.sample(students, min(args.group_size, len(students)))
+                for group_id in groups
+            }
+            await _copy(
+                conn,
+                "students_to_groups",
+                ["group_id", "student_id"],
+                (
+                    (group_id, student_id)
+                    for group_id, roster in members.items()
+                    for student_id in roster
+                ),
+            )
+            lesson_groups = {
+                lesson_id: groups[(lesson_id - first_lesson) // args.lessons]
+                for lesson_id in lessons
+            }
+
+            def lesson_rows():
+                for lesson_id, group_id in lesson_groups.items():
+                    starts_at = term_start + timedelta(
+                        minutes=rng.randrange(args.days * 24 * 60)
+                    )
+                    yield (
+                        lesson_id,
+                        group_id,
+                        starts_at,
+                        starts_at + timedelta(minutes=90),
+                        None,
+                    )
+
+            await _copy(
+                conn,
+                "lessons",
+                ["id", "group_id", "starts_at", "ends_at", "theme"],
+                lesson_rows(),
+            )
+            await _copy(
+                conn,
+                "events",
+                ["id", "comment", "base_amount"],
+                ((i, f"event {i}", rng.randint(1, 10)) for i in events),
+            )
+
+            def score_rows():
+                for i in range(first_score, first_score + args.scores):
+                    lesson_id = rng.choice(lessons)
+                    roster = members[lesson_groups[lesson_id]]
+                    yield (
+                        i,
+                        rng.choice(roster),
+                        rng.choice(roster),
+                        lesson_id,
+                        rng.randint(-2, 10),
+                        rng.choice(score_types),
+                        rng.choice(events),
+                        term_start
+                        + timedelta(seconds=rng.randrange(args.days * 24 * 3600)),
+                    )
+
+            await _copy(
+                conn,
+                "score_entries",
+                [
+                    "id",
+                    "student_id",
+                    "judge_id",
+                    "lesson_id",
+                    "amount",
+                    "score_type",
+                    "event_id",
+                    "created_at",
+                ],
+                score_rows(),
+            )
+            for table in ("students", "groups", "lessons", "events", "score_entries"):
+                await conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'),"
+                    f" (SELECT max(id) FROM {table}))"
+                )
+    finally:
+        await conn.close()
+
+    async with session_factory() as db, db.begin():
+        await ratings.rebuild(db)
+    print("rebuilt student ratings")
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.generate")
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--groups", type=int, default=1_000)
+    parser.add_argument("--group-size", type=int, default=30)
+    parser.add_argument("--lessons", type=int, default=60, help="lessons per group")
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--scores", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=120, help="length of the term")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    asyncio.run(generate(parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-row cost of ORM + `orm_mode` serialization vs column rows (`app.rows`).
+
+python -m bench.rows --rows 5000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import sqlalchemy as sql
+
+from app import rows
+from app.database import ScoreEntry, Student, read_session_factory
+from app.schemas import ScoreEntryOut, StudentOut
+
+from .stats import percentile
+
+CASES = {"students": (Student, StudentOut), "scores": (ScoreEntry, ScoreEntryOut)}
+
+
+async def orm_path(model, schema, limit: int) -> tuple[float, float, bytes]:
+    async with read_session_factory() as db:
+        started = time.perf_counter()
+        query = sql.select(model).order_by(model.id).limit(limit)
+        items = (await db.execute(query)).scalars().all()
+        fetched = time.perf_counter()
+        # what FastAPI does with a response_model: validate, encode, render
+        models = [schema.from_orm(item) for item in items]
+        body = JSONResponse(jsonable_encoder(models)).body
+        return fetched - started, time.perf_counter() - fetched, body
+
+
+async def rows_path(model, schema, limit: int) -> tuple[float, float, bytes]:
+    async with read_session_factory() as db:
+        started = time.perf_counter()
+        query = rows.select(model, schema).order_by(model.id).limit(limit)
+        items = await rows.fetch(db, query)
+        fetched = time.perf_counter()
+        body = rows.RowsResponse(items).body
+        return fetched - started, time.perf_counter() - fetched, body
+
+
+async def main_async(args: argparse.Namespace):
+    print(
+        f"{'case':<10} {'path':<5} {'fetch us/row':>13}"
+        f" {'serialize us/row':>17} {'total us/row':>13}"
+    )
+    for name, (model, schema) in CASES.items():
+        bodies = {}
+        for path_name, path in (("orm", orm_path), ("rows", rows_path)):
+            await path(model, schema, args.rows)  # warm up compiled caches
+            fetch, serialize = [], []
+            for _ in range(args.repeat):
+                fetch_s, serialize_s, bodies[path_name] = await path(
+                    model, schema, args.rows
+                )
+                fetch.append(fetch_s)
+                serialize.append(serialize_s)
+            fetch_us = percentile(sorted(fetch), 0.5) / args.rows * 1e6
+            serialize_us = percentile(sorted(serialize), 0.5) / args.rows * 1e6
+            print(
+                f"{name:<10} {path_name:<5} {fetch_us:>13.2f}"
+                f" {serialize_us:>17.2f} {fetch_us + serialize_us:>13.2f}"
+            )
+        if json.loads(bodies["orm"]) != json.loads(bodies["rows"]):
+            print(f"{name}: WARNING, the two paths produced different JSON")
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.rows")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    asyncio.run(main_async(parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Drive the API with a weighted mix of scenarios and report latency per route.
+
+python -m bench.run --duration 30 --concurrency 32
+python -m bench.run --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+import httpx
+import sqlalchemy as sql
+
+from app.database import Event, Group, Lesson, Student, session_factory
+from .stats import Recorder
+
+
+@dataclass
+class Ids:
+    students: list[int]
+    groups: list[int]
+    lessons: list[tuple[int, int]]
+    events: list[int]
+
+
+async def sample_ids(size: int = 1000) -> Ids:
+    async with session_factory() as db:
+
+        async def sample(*columns):
+            query = sql.select(*columns).order_by(sql.func.random()).limit(size)
+            return (await db.execute(query)).all()
+
+        return Ids(
+            students=[row.id for row in await sample(Student.id)],
+            groups=[row.id for row in await sample(Group.id)],
+            lessons=[tuple(row) for row in await sample(Lesson.group_id, Lesson.id)],
+            events=[row.id for row in await sample(Event.id)],
+        )
+
+
+def scenarios(rng: random.Random, ids: Ids):
+    def student():
+        return rng.choice(ids.students)
+
+    def group():
+        return rng.choice(ids.groups)
+
+    def score(lesson_id: int):
+        return {
+            "student_id": student(),
+            "judge_id": student(),
+            "lesson_id": lesson_id,
+            "amount": rng.randint(1, 5),
+            "score_type": "robotics",
+            "event_id": rng.choice(ids.events),
+        }
+
+    # name: (weight, request factory)
+    return {
+        "GET /students/": (
+            10,
+            lambda: ("GET", "/students/", {"page": rng.randint(1, 50)}),
+        ),
+        "GET /students/cursor": (10, lambda: ("GET", "/students/cursor", None)),
+        "GET /groups/": (5, lambda: ("GET", "/groups/", None)),
+        "GET /groups/{id}/students": (
+            10,
+            lambda: ("GET", f"/groups/{group()}/students", None),
+        ),
+        "GET /groups/{id}/lessons/cursor": (
+            5,
+            lambda: ("GET", f"/groups/{group()}/lessons/cursor", None),
+        ),
+        "GET /groups/{id}/leaderboard/": (
+            10,
+            lambda: ("GET", f"/groups/{group()}/leaderboard/", None),
+        ),
+        "GET /students/{id}/scores/": (
+            10,
+            lambda: ("GET", f"/students/{student()}/scores/", None),
+        ),
+        "POST /students/": (
+            2,
+            lambda: ("POST", "/students/", {"firstname": "Bench", "lastname": "Mark"}),
+        ),
+        "PATCH /students/{id}": (
+            2,
+            lambda: ("PATCH", f"/students/{student()}", {"lastname": "Patched"}),
+        ),
+        "PUT /groups/{id}/students/{id}": (
+            2,
+            lambda: ("PUT", f"/groups/{group()}/students/{student()}", None),
+        ),
+        "POST /groups/{id}/lessons/{id}/scores/": (
+            5,
+            lambda: (
+                "POST",
+                "/groups/{}/lessons/{}/scores/".format(
+                    *(lesson := rng.choice(ids.lessons))
+                ),
+                score(lesson[1]),
+            ),
+        ),
+    }
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    rng: random.Random,
+    ids: Ids,
+    deadline: float,
+    only: set[str] | None,
+):
+    mix = {
+        name: scenario
+        for name, scenario in scenarios(rng, ids).items()
+        if only is None or name in only
+    }
+    names = list(mix)
+    weights = [weight for weight, _ in mix.values()]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, url, data = mix[name][1]()
+        kwargs = {"params": data} if method == "GET" else {"json": data}
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        recorder.record(name, time.perf_counter() - started, ok)
+
+
+async def run(args: argparse.Namespace) -> Recorder:
+    ids = await sample_ids()
+    recorder = Recorder()
+    only = set(args.only) if args.only else None
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        from app import app
+
+        await app.router.startup()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30
+        )
+
+    async with client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                worker(
+                    client, recorder, random.Random(args.seed + i), ids, deadline, only
+                )
+                for i in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    if not args.url:
+        await app.router.shutdown()
+    print(recorder.report(elapsed))
+    return recorder
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.run")
+    parser.add_argument(
+        "--url", help="benchmark a running server instead of in-process"
+    )
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    asyncio.run(run(parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure cold start: import time, startup hooks and first vs second request.
+
+Every run is a fresh interpreter, so nothing is warm from the previous one.
+
+python -m bench.startup --runs 10
+python -m bench.startup --path /students/ --path /groups/1/students
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .stats import percentile
+
+DEFAULT_PATHS = ["/students/", "/groups/", "/leaderboard/"]
+
+
+async def measure(paths: list[str]) -> dict[str, float]:
+    started = time.perf_counter()
+    from app import app
+
+    timings = {"import": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    await app.router.startup()
+    timings["startup"] = time.perf_counter() - started
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        for attempt in ("first", "second"):
+            for path in paths:
+                started = time.perf_counter()
+                resp = await client.get(path)
+                resp.raise_for_status()
+                timings[f"{attempt} {path}"] = time.perf_counter() - started
+
+    await app.router.shutdown()
+    return timings
+
+
+def run_child(paths: list[str]) -> dict[str, float]:
+    # the response cache would turn every second request into a cache hit
+    env = {**os.environ, "FTK_RESPONSE_CACHE_TTL": "0"}
+    command = [sys.executable, "-m", "bench.startup", "--child"]
+    for path in paths:
+        command += ["--path", path]
+    out = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def report(runs: list[dict[str, float]]) -> str:
+    lines = [f"{'phase':<40} {'p50 ms':>8} {'max ms':>8}"]
+    for phase in runs[0]:
+        values = sorted(run[phase] for run in runs)
+        lines.append(
+            f"{phase:<40} {percentile(values, 0.5) * 1000:>8.2f}"
+            f" {values[-1] * 1000:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", action="append", help="GET paths to request")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    args = parser().parse_args(argv)
+    paths = args.path or DEFAULT_PATHS
+    if args.child:
+        print(json.dumps(asyncio.run(measure(paths))))
+        return
+    print(report([run_child(paths) for _ in range(args.runs)]))
+
+
+if __name__ == "__main__":
+    main()
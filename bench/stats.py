@@ -0,0 +1,42 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+class Recorder:
+    def __init__(self):
+        self.routes: dict[str, RouteStats] = defaultdict(RouteStats)
+
+    def record(self, route: str, seconds: float, ok: bool):
+        stats = self.routes[route]
+        stats.latencies.append(seconds)
+        if not ok:
+            stats.errors += 1
+
+    def report(self, elapsed: float) -> str:
+        lines = [
+            f"{'route':<40} {'count':>7} {'err':>5} {'rps':>8}"
+            f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        ]
+        for route, stats in sorted(self.routes.items()):
+            values = sorted(stats.latencies)
+            lines.append(
+                f"{route:<40} {len(values):>7} {stats.errors:>5}"
+                f" {len(values) / elapsed:>8.1f}"
+                + "".join(
+                    f" {percentile(values, q) * 1000:>8.2f}" for q in (0.5, 0.95, 0.99)
+                )
+            )
+        return "\n".join(lines)
@@ -0,0 +1,101 @@
+"""Compare throughput of `python -m app.serve` with 1 and N workers.
+
+python -m bench.workers --workers 1 4 --duration 20 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from . import run
+
+LIST_SCENARIOS = [
+    "GET /students/",
+    "GET /students/cursor",
+    "GET /groups/",
+    "GET /groups/{id}/students",
+    "GET /groups/{id}/lessons/cursor",
+]
+
+
+async def wait_ready(url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise SystemExit(f"server exited with {server.returncode}")
+            try:
+                if (await client.get("/groups/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"server at {url} did not become ready")
+
+
+async def measure(workers: int, args: argparse.Namespace) -> float:
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers)]
+        + ["--port", str(args.port), "--log-level", "warning"],
+        env={**os.environ, "FTK_RESPONSE_CACHE_TTL": str(args.cache_ttl)},
+    )
+    try:
+        await wait_ready(url, server)
+        print(f"\n{workers} worker(s)")
+        recorder = await run.run(
+            run.parser().parse_args(
+                ["--url", url, "--duration", str(args.duration)]
+                + ["--concurrency", str(args.concurrency)]
+                + ["--only", *LIST_SCENARIOS]
+            )
+        )
+    finally:
+        # SIGTERM exercises the graceful drain path
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return sum(len(stats.latencies) for stats in recorder.routes.values()) / (
+        args.duration
+    )
+
+
+async def main_async(args: argparse.Namespace):
+    throughput = {}
+    for workers in args.workers:
+        throughput[workers] = await measure(workers, args)
+
+    print(f"\n{'workers':>7} {'rps':>9} {'speedup':>8}")
+    baseline = throughput[args.workers[0]]
+    for workers, rps in throughput.items():
+        print(f"{workers:>7} {rps:>9.1f} {rps / baseline:>7.2f}x")
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.workers")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1]
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        help="FTK_RESPONSE_CACHE_TTL for the server; 0 measures uncached reads",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    asyncio.run(main_async(parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
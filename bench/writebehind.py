@@ -0,0 +1,79 @@
+"""Compare single score creates with and without write-behind batching.
+
+python -m bench.writebehind --modes off commit queued --duration 20 --concurrency 128
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+from . import run
+from .workers import wait_ready
+
+SCENARIO = "POST /groups/{id}/lessons/{id}/scores/"
+
+
+async def measure(mode: str, args: argparse.Namespace) -> tuple[float, float]:
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", "1"]
+        + ["--port", str(args.port), "--log-level", "warning"],
+        env={
+            **os.environ,
+            "FTK_SCORE_WRITE_BEHIND": mode,
+            # a small pool is what bursts of single writes exhaust
+            "FTK_POOL_SIZE": str(args.pool_size),
+            "FTK_MAX_OVERFLOW": "0",
+        },
+    )
+    try:
+        await wait_ready(url, server)
+        print(f"\nwrite-behind {mode}")
+        recorder = await run.run(
+            run.parser().parse_args(
+                ["--url", url, "--duration", str(args.duration)]
+                + ["--concurrency", str(args.concurrency), "--only", SCENARIO]
+            )
+        )
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    latencies = sorted(recorder.routes[SCENARIO].latencies)
+    return len(latencies) / args.duration, latencies[int(len(latencies) * 0.99)]
+
+
+async def main_async(args: argparse.Namespace):
+    results = {}
+    for mode in args.modes:
+        results[mode] = await measure(mode, args)
+
+    print(f"\n{'mode':>7} {'rps':>9} {'p99 ms':>8} {'speedup':>8}")
+    baseline = results[args.modes[0]][0]
+    for mode, (rps, p99) in results.items():
+        print(f"{mode:>7} {rps:>9.1f} {p99 * 1000:>8.1f} {rps / baseline:>7.2f}x")
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench.writebehind")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["off", "commit", "queued"],
+        default=["off", "commit", "queued"],
+    )
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--pool-size", type=int, default=5)
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    asyncio.run(main_async(parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+import sqlalchemy as sql
+
+from app.analytics import SCORE_TYPES, Snapshot, _dtypes
+from app.database import ScoreEntry, session_factory
+from app.schemas import ScoreTypeEnum
+
+
+def test_refresh_picks_up_entries_committed_out_of_id_order(run):
+    async def main():
+        snapshot = Snapshot()
+        async with session_factory() as db:
+            await snapshot.refresh(db, force=True)
+            (entry,) = await db.execute(
+                sql.select(ScoreEntry.__table__).order_by(ScoreEntry.id).limit(1)
+            )
+        values = dict(entry._mapping)
+        del values["id"], values["created_at"]
+        loaded = len(snapshot)
+
+        async with session_factory() as late, session_factory() as early:
+            insert = sql.insert(ScoreEntry).values(values).returning(ScoreEntry.id)
+            late_id = (await late.execute(insert)).scalar()
+            early_id = (await early.execute(insert)).scalar()
+            await early.commit()
+            async with session_factory() as db:
+                await snapshot.refresh(db, force=True)
+            assert early_id in snapshot.columns["id"]
+            assert late_id not in snapshot.columns["id"]
+            await late.commit()
+
+        async with session_factory() as db:
+            await snapshot.refresh(db, force=True)
+        assert len(snapshot) == loaded + 2
+        assert late_id in snapshot.columns["id"]
+
+    run(main())
+
+
+def test_requests_after_the_first_leave_refreshes_to_the_background(client, statements):
+    assert client.get("/analytics/percentiles").status_code == 200
+    assert statements
+
+    statements.clear()
+    assert client.get("/analytics/percentiles").status_code == 200
+    assert client.get("/analytics/events").status_code == 200
+    assert statements == []
+
+
+def test_judge_bias_compares_each_judge_with_the_others_only():
+    # (judge, score type, amount)
+    entries = [
+        (1, ScoreTypeEnum.robotics, 10),
+        (1, ScoreTypeEnum.robotics, 10),
+        (2, ScoreTypeEnum.robotics, 0),
+        (2, ScoreTypeEnum.robotics, 0),
+        (3, ScoreTypeEnum.electrics, 5),
+    ]
+    snapshot = Snapshot()
+    snapshot.columns = {
+        name: np.zeros(len(entries), dtype) for name, dtype in _dtypes.items()
+    }
+    snapshot.columns["judge_id"][:] = [judge for judge, _, _ in entries]
+    snapshot.columns["score_type"][:] = [SCORE_TYPES.index(t) for _, t, _ in entries]
+    snapshot.columns["amount"][:] = [amount for _, _, amount in entries]
+
+    bias = {
+        judge.judge_id: judge.bias
+        for judge in snapshot.judge_bias(None, None, min_entries=1, limit=10)
+    }
+    assert bias == {1: 10, 2: -10, 3: 0}
@@ -0,0 +1,75 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def seeded(fetch) -> tuple[list[int], int]:
+    """200 student ids and an event id."""
+    students = fetch("SELECT id FROM students ORDER BY id LIMIT 200")
+    ((event_id,),) = fetch("SELECT min(id) FROM events")
+    return [row["id"] for row in students], event_id
+
+
+def _group_with_roster(client, student_ids: list[int], event_id: int) -> int:
+    group = client.post(
+        "/groups/",
+        json={
+            "name": f"roster of {len(student_ids)}",
+            "teacher_id": student_ids[0],
+            "default_score_type": "robotics",
+        },
+    ).json()
+    client.put(f"/groups/{group['id']}/students", json={"student_ids": student_ids})
+    lesson = client.post(
+        f"/groups/{group['id']}/lessons/",
+        json={
+            "group_id": group["id"],
+            "starts_at": "2026-10-01T10:00:00",
+            "ends_at": "2026-10-01T11:30:00",
+        },
+    ).json()
+    scores = [
+        {
+            "student_id": student_id,
+            "judge_id": student_ids[0],
+            "lesson_id": lesson["id"],
+            "amount": 1,
+            "score_type": score_type,
+            "event_id": event_id,
+        }
+        for student_id in student_ids
+        for score_type in ("robotics", "electrics")
+    ]
+    response = client.post(
+        f"/groups/{group['id']}/lessons/{lesson['id']}/scores:bulk", json=scores
+    )
+    assert response.json()["errors"] == []
+    return group["id"]
+
+
+@pytest.mark.parametrize("roster", [1, 20, 200])
+def test_dashboard_query_count_is_fixed(client, statements, seeded, roster):
+    student_ids, event_id = seeded
+    group_id = _group_with_roster(client, student_ids[:roster], event_id)
+
+    statements.clear()
+    response = client.get(f"/groups/{group_id}/dashboard")
+
+    assert response.status_code == 200
+    dashboard = response.json()
+    assert len(dashboard["students"]) == len(dashboard["totals"]) == roster
+    assert len(statements) == 4
+
+
+def test_dashboard_totals_cover_the_requested_period(client, seeded):
+    student_ids, event_id = seeded
+    group_id = _group_with_roster(client, student_ids[:3], event_id)
+    dashboard = f"/groups/{group_id}/dashboard"
+
+    totals = client.get(dashboard).json()["totals"]
+    assert all(student["totals"] for student in totals)
+
+    totals = client.get(dashboard, params={"since": "2999-01-01"}).json()["totals"]
+    assert all(student["totals"] == {} for student in totals)
+    assert (
+        len(client.get(dashboard, params={"recent": 0}).json()["recent_lessons"]) == 0
+    )
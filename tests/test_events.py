@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "award",
+    [
+        {"lesson_id": 2**31, "judge_id": 1},
+        {"lesson_id": 1, "judge_id": 2**31},
+        {"lesson_id": 1, "judge_id": 1, "student_ids": [2**31]},
+    ],
+)
+def test_award_rejects_out_of_range_ids(client, fetch, award):
+    ((event_id,),) = fetch("SELECT min(id) FROM events")
+    response = client.post(f"/events/{event_id}/award", json=award)
+    assert response.status_code == 422
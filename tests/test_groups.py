@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.mark.parametrize("method", ["PUT", "DELETE"])
+def test_membership_rejects_out_of_range_ids(client, fetch, method):
+    ((group_id,),) = fetch("SELECT min(id) FROM groups")
+    response = client.request(
+        method, f"/groups/{group_id}/students", json={"student_ids": [1, 2**31]}
+    )
+    assert response.status_code == 422
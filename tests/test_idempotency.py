@@ -0,0 +1,128 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.database import session_factory
+from app.idempotency import HEADER, Stored, _claim, _store, recent
+
+
+@pytest.fixture
+def key() -> str:
+    return str(uuid4())
+
+
+@pytest.fixture
+def group(fetch) -> dict:
+    ((teacher_id,),) = fetch("SELECT min(id) FROM students")
+    return {
+        "name": f"idempotent {uuid4()}",
+        "teacher_id": teacher_id,
+        "default_score_type": "robotics",
+    }
+
+
+def test_repeated_key_replays_the_stored_response(client, fetch, key, group):
+    first = client.post("/groups/", json=group, headers={HEADER: key})
+    assert first.status_code == 200
+
+    replayed = client.post("/groups/", json=group, headers={HEADER: key})
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == first.json()
+
+    # from Postgres, as another worker would
+    recent._entries.clear()
+    replayed = client.post("/groups/", json=group, headers={HEADER: key})
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == first.json()
+
+    ((count,),) = fetch("SELECT count(*) FROM groups WHERE name = $1", group["name"])
+    assert count == 1
+
+
+def test_key_reused_with_another_body_is_rejected(client, key, group):
+    assert client.post("/groups/", json=group, headers={HEADER: key}).is_success
+
+    other = {**group, "name": group["name"] + " (2)"}
+    response = client.post("/groups/", json=other, headers={HEADER: key})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("outcome", ["commit", "rollback"])
+def test_concurrent_claim_waits_for_the_first(run, key, outcome):
+    scope = "POST /test"
+    stored = Stored("fingerprint", 200, "application/json", b"{}")
+
+    async def main():
+        async with session_factory() as first, session_factory() as second:
+            assert await _claim(first, scope, key, stored.fingerprint) is None
+            waiting = asyncio.create_task(
+                _claim(second, scope, key, stored.fingerprint)
+            )
+            await asyncio.sleep(0.2)
+            assert not waiting.done()
+
+            if outcome == "commit":
+                await _store(first, scope, key, stored)
+                await first.commit()
+            else:
+                await first.rollback()
+            return await waiting
+
+    # after a rollback the second request takes the key over
+    assert run(main()) == (stored if outcome == "commit" else None)
+
+
+def test_expired_key_is_taken_over(run, fetch, key):
+    scope = "POST /test"
+    stored = Stored("old", 200, "application/json", b"{}")
+
+    async def claim(fingerprint: str) -> Stored | None:
+        async with session_factory() as db, db.begin():
+            claimed = await _claim(db, scope, key, fingerprint)
+            if claimed is None:
+                await _store(db, scope, key, stored._replace(fingerprint=fingerprint))
+            return claimed
+
+    assert run(claim("old")) is None
+    assert run(claim("new")) == stored
+
+    fetch(
+        "UPDATE idempotency_keys SET expires_at = now() - interval '1 second'"
+        " WHERE key = $1",
+        key,
+    )
+    assert run(claim("new")) is None
+    ((fingerprint,),) = fetch(
+        "SELECT fingerprint FROM idempotency_keys WHERE key = $1", key
+    )
+    assert fingerprint == "new"
+
+
+def test_keyed_score_create_bypasses_write_behind(client, fetch, monkeypatch, key):
+    monkeypatch.setattr(settings, "score_write_behind", "queued")
+    ((lesson_id, group_id, student_id, event_id),) = fetch(
+        "SELECT l.id, l.group_id, (SELECT min(id) FROM students),"
+        " (SELECT min(id) FROM events) FROM lessons l ORDER BY l.id LIMIT 1"
+    )
+    scores = f"/groups/{group_id}/lessons/{lesson_id}/scores/"
+    score = {
+        "student_id": student_id,
+        "judge_id": student_id,
+        "lesson_id": lesson_id,
+        "amount": 1,
+        "score_type": "robotics",
+        "event_id": event_id,
+    }
+
+    assert client.post(scores, json=score).status_code == 202
+
+    created = client.post(scores, json=score, headers={HEADER: key})
+    assert created.status_code == 200
+    ((count,),) = fetch(
+        "SELECT count(*) FROM score_entries WHERE id = $1", created.json()["id"]
+    )
+    assert count == 1
+    replayed = client.post(scores, json=score, headers={HEADER: key})
+    assert replayed.json() == created.json()
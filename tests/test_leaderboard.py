@@ -0,0 +1,57 @@
+import json
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app import app
+from app.config import settings
+from app.leaderboard import board
+
+
+@pytest.fixture
+def outsider(database, fetch) -> tuple[int, int]:
+    """(group id, student id) of a student not in the group."""
+    ((group_id, student_id),) = fetch(
+        "SELECT g.id, s.id FROM groups g, students s WHERE NOT EXISTS ("
+        " SELECT FROM students_to_groups m"
+        " WHERE m.group_id = g.id AND m.student_id = s.id"
+        ") ORDER BY g.id DESC, s.id DESC LIMIT 1"
+    )
+    return group_id, student_id
+
+
+def test_membership_changes_of_other_workers_arrive_over_notify(
+    monkeypatch, fetch, wait_for, outsider
+):
+    group_id, student_id = outsider
+    monkeypatch.setattr(settings, "live_notify", True)
+    with TestClient(app):
+        assert group_id not in board.groups_of(student_id)
+        payload = {"pid": 0, "group_id": group_id, "added": [student_id]}
+        fetch("SELECT pg_notify('ftk_members', $1)", json.dumps(payload))
+        assert wait_for(lambda: group_id in board.groups_of(student_id))
+
+        payload = {"pid": 0, "group_id": group_id, "removed": [student_id]}
+        fetch("SELECT pg_notify('ftk_members', $1)", json.dumps(payload))
+        assert wait_for(lambda: group_id not in board.groups_of(student_id))
+
+
+def test_board_reloads_changes_of_other_workers(monkeypatch, fetch, wait_for, outsider):
+    group_id, student_id = outsider
+    monkeypatch.setattr(settings, "live_notify", False)
+    monkeypatch.setattr(settings, "leaderboard_reload_interval", 0.05)
+    with TestClient(app):
+        fetch(
+            "INSERT INTO students_to_groups (group_id, student_id)" " VALUES ($1, $2)",
+            group_id,
+            student_id,
+        )
+        try:
+            assert wait_for(lambda: group_id in board.groups_of(student_id))
+        finally:
+            fetch(
+                "DELETE FROM students_to_groups"
+                " WHERE group_id = $1 AND student_id = $2",
+                group_id,
+                student_id,
+            )
@@ -0,0 +1,32 @@
+from datetime import date
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app import history
+from app.config import settings
+
+VERSIONS = Path(__file__).parent.parent / "alembic" / "versions"
+
+
+def _migration(name: str):
+    path = next(VERSIONS.glob(f"{name}_*.py"))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("months", [[1, 9], [2, 9], [4]])
+def test_rollup_backfill_buckets_terms_like_the_app(fetch, monkeypatch, months):
+    monkeypatch.setattr(settings, "term_start_months", months)
+    term = _migration("3c8e0f6a2b17")._buckets(months)["term"]
+
+    rows = fetch(
+        f"SELECT created_at::date, {term} FROM generate_series("
+        " '2025-01-01'::timestamp, '2025-12-31', '1 day') AS created_at"
+    )
+
+    assert all(bucket == history.term_start(day) for day, bucket in rows)
+    assert {bucket for _, bucket in rows} >= {date(2025, m, 1) for m in months}
@@ -0,0 +1,34 @@
+import base64
+
+import pytest
+
+
+def _cursor(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "%%%",
+        _cursor(b"{not json"),
+        _cursor(b'"12"'),
+        _cursor(b"1.5"),
+        _cursor(b"true"),
+        _cursor(b"[1]"),
+        _cursor(b"99999999999"),
+    ],
+)
+def test_invalid_cursor_is_a_bad_request(client, cursor):
+    response = client.get("/groups/cursor", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_next_cursor_continues_the_listing(client):
+    first = client.get("/groups/cursor", params={"size": 2}).json()
+    second = client.get(
+        "/groups/cursor", params={"size": 2, "cursor": first["next_cursor"]}
+    ).json()
+    assert [group["id"] for group in second["items"]] > [
+        group["id"] for group in first["items"]
+    ]
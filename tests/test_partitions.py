@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+import sqlalchemy as sql
+
+from app import partitions
+from app.database import ScoreEntry, session_factory
+
+
+def test_generated_entries_land_in_monthly_partitions(fetch):
+    ((count,),) = fetch(f"SELECT count(*) FROM {partitions.DEFAULT}")
+    assert count == 0
+
+
+def test_maintain_splits_months_out_of_the_default_partition(run, fetch):
+    async def main():
+        async with session_factory() as db, db.begin():
+            (entry,) = await db.execute(sql.select(ScoreEntry.__table__).limit(1))
+            values = dict(entry._mapping)
+            del values["id"]
+            values["created_at"] = datetime(2020, 1, 15)
+            await db.execute(sql.insert(ScoreEntry).values(values))
+
+        async with session_factory() as db, db.begin():
+            return await partitions.maintain(
+                db, date.today(), ahead=0, keep=None, archive_schema="archive"
+            )
+
+    created, detached = run(main())
+
+    assert created == [date(2020, 1, 1)]
+    assert detached == []
+    ((count,),) = fetch(f"SELECT count(*) FROM {partitions.DEFAULT}")
+    assert count == 0
+    ((count,),) = fetch(
+        f"SELECT count(*) FROM {partitions.partition_name(date(2020, 1, 1))}"
+    )
+    assert count == 1
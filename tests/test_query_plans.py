@@ -0,0 +1,68 @@
+"""Every query behind the hot read endpoints must reach big tables by index."""
+
+import json
+
+import pytest
+
+ENDPOINTS = [
+    "/students/{student_id}/scores/",
+    "/students/{student_id}/scores/cursor",
+    "/students/{student_id}/scores/judged",
+    "/students/{student_id}/scores/judged/cursor",
+    "/students/{student_id}/scores/export",
+    "/students/{student_id}/rating",
+    "/students/{student_id}/rating/history",
+    "/groups/{group_id}/students",
+    "/groups/{group_id}/dashboard",
+    "/groups/{group_id}/lessons/",
+    "/groups/{group_id}/lessons/cursor",
+    "/groups/{group_id}/scores/export",
+    "/groups/{group_id}/rating/history",
+]
+# below this many rows a sequential scan is the right plan
+MIN_ROWS = 10_000
+
+
+def _seq_scans(plan: dict):
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+@pytest.fixture(scope="module")
+def big_relations(fetch) -> set[str]:
+    rows = fetch(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= $1",
+        MIN_ROWS,
+    )
+    return {row["relname"] for row in rows}
+
+
+@pytest.fixture(scope="module")
+def ids(fetch) -> dict[str, int]:
+    (row,) = fetch(
+        "SELECT s.student_id, l.group_id FROM score_entries s"
+        " JOIN lessons l ON l.id = s.lesson_id ORDER BY s.id LIMIT 1"
+    )
+    return dict(row)
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_no_sequential_scans(client, statements, fetch, big_relations, ids, path):
+    response = client.get(path.format(**ids))
+    assert response.status_code == 200
+
+    selects = [
+        (statement, parameters)
+        for statement, parameters in statements
+        if statement.lstrip().upper().startswith("SELECT")
+    ]
+    assert selects
+    scanned = {}
+    for statement, parameters in selects:
+        ((explained,),) = fetch("EXPLAIN (FORMAT JSON) " + statement, *parameters)
+        scans = set(_seq_scans(json.loads(explained)[0]["Plan"])) & big_relations
+        if scans:
+            scanned[statement] = scans
+    assert scanned == {}
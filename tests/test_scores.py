@@ -0,0 +1,118 @@
+import pytest
+
+
+@pytest.fixture
+def lesson(client, fetch) -> dict:
+    """A fresh lesson with one score entry, and a group it does not belong to."""
+    ((group_id, other_group_id),) = fetch(
+        "SELECT min(id), max(id) FROM groups WHERE id IN"
+        " (SELECT group_id FROM students_to_groups)"
+    )
+    ((student_id,),) = fetch(
+        "SELECT student_id FROM students_to_groups WHERE group_id = $1 LIMIT 1",
+        group_id,
+    )
+    ((event_id,),) = fetch("SELECT min(id) FROM events")
+    lesson_id = client.post(
+        f"/groups/{group_id}/lessons/",
+        json={
+            "group_id": group_id,
+            "starts_at": "2026-10-01T10:00:00",
+            "ends_at": "2026-10-01T11:30:00",
+        },
+    ).json()["id"]
+    score = {
+        "student_id": student_id,
+        "judge_id": student_id,
+        "lesson_id": lesson_id,
+        "amount": 1,
+        "score_type": "robotics",
+        "event_id": event_id,
+    }
+    response = client.post(
+        f"/groups/{group_id}/lessons/{lesson_id}/scores/", json=score
+    )
+    assert response.status_code == 200
+    return {
+        "id": lesson_id,
+        "group_id": group_id,
+        "other_group_id": other_group_id,
+        "score": score,
+        "score_id": response.json()["id"],
+    }
+
+
+def test_scores_of_a_lesson_are_not_reachable_through_another_group(client, lesson):
+    scores = f"/groups/{lesson['other_group_id']}/lessons/{lesson['id']}/scores"
+    score_id = lesson["score_id"]
+
+    assert client.post(f"{scores}/", json=lesson["score"]).status_code == 404
+    assert client.post(f"{scores}:bulk", json=[lesson["score"]]).status_code == 404
+    assert client.patch(f"{scores}/{score_id}", json={"amount": 5}).status_code == 404
+    assert client.delete(f"{scores}/{score_id}").status_code == 404
+
+    scores = f"/groups/{lesson['group_id']}/lessons/{lesson['id']}/scores"
+    assert client.patch(f"{scores}/{score_id}", json={"amount": 5}).status_code == 200
+    assert client.delete(f"{scores}/{score_id}").status_code == 204
+
+
+def test_moved_lesson_leaves_its_old_group(client, lesson):
+    old, new = lesson["group_id"], lesson["other_group_id"]
+    response = client.patch(
+        f"/groups/{old}/lessons/{lesson['id']}", json={"group_id": new}
+    )
+    assert response.status_code == 200
+    assert response.json()["group_id"] == new
+
+    scores = f"/lessons/{lesson['id']}/scores/"
+    assert (
+        client.post(f"/groups/{old}{scores}", json=lesson["score"]).status_code == 404
+    )
+    assert (
+        client.post(f"/groups/{new}{scores}", json=lesson["score"]).status_code == 200
+    )
+
+
+def test_empty_updates_are_rejected(client, lesson):
+    lessons = f"/groups/{lesson['group_id']}/lessons/{lesson['id']}"
+
+    assert client.patch(lessons, json={}).status_code == 422
+    assert (
+        client.patch(f"{lessons}/scores/{lesson['score_id']}", json={}).status_code
+        == 422
+    )
+
+
+@pytest.mark.parametrize("field", ["student_id", "judge_id", "event_id"])
+def test_unknown_references_are_rejected(client, lesson, field):
+    scores = f"/groups/{lesson['group_id']}/lessons/{lesson['id']}/scores"
+    unknown = {field: 2**31 - 1}
+
+    response = client.post(f"{scores}/", json={**lesson["score"], **unknown})
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"{field} {2**31 - 1} does not exists"
+
+    response = client.patch(f"{scores}/{lesson['score_id']}", json=unknown)
+    assert response.status_code == 422
+
+
+def test_bulk_rows_with_out_of_range_ids_are_reported(client, lesson):
+    scores = f"/groups/{lesson['group_id']}/lessons/{lesson['id']}/scores"
+    rows = [lesson["score"], {**lesson["score"], "student_id": 2**31}]
+
+    response = client.post(f"{scores}:bulk", json=rows)
+    assert response.status_code == 200
+    assert len(response.json()["created"]) == 1
+    [error] = response.json()["errors"]
+    assert error["row"] == 1
+    assert error["detail"].startswith("student_id: ")
+
+
+def test_lesson_moved_by_another_worker_leaves_its_old_group(client, fetch, lesson):
+    old, new = lesson["group_id"], lesson["other_group_id"]
+    fetch("UPDATE lessons SET group_id = $1 WHERE id = $2", new, lesson["id"])
+
+    scores = f"/lessons/{lesson['id']}/scores/"
+    assert (
+        client.post(f"/groups/{old}{scores}", json=lesson["score"]).status_code == 404
+    )
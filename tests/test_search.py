@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+import pytest
+
+from app import app
+from app.config import settings
+from app.search import names
+
+NAMES = [("Bob", "Quixot"), ("Don", "Quixote"), ("Ann", "Quixotes")]
+
+
+@pytest.fixture(scope="module")
+def students(database) -> dict[str, int]:
+    with TestClient(app) as client:
+        return {
+            lastname: client.post(
+                "/students/", json={"firstname": firstname, "lastname": lastname}
+            ).json()["id"]
+            for firstname, lastname in NAMES
+        }
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_prefix_matches_come_before_similar_names(client, monkeypatch, students, index):
+    monkeypatch.setattr(settings, "student_search_index", index)
+    response = client.get("/students/search", params={"q": "quixote"})
+
+    assert response.status_code == 200
+    assert [match["id"] for match in response.json()] == [
+        students["Quixote"],
+        students["Quixotes"],
+        students["Quixot"],
+    ]
+
+
+def test_index_reloads_names_written_by_other_workers(monkeypatch, fetch, wait_for):
+    monkeypatch.setattr(settings, "live_notify", False)
+    monkeypatch.setattr(settings, "student_search_reload_interval", 0.05)
+    with TestClient(app):
+        fetch(
+            "INSERT INTO students (firstname, lastname, created_at, updated_at)"
+            " VALUES ('Ada', 'Zwolinska', now(), now())"
+        )
+        assert wait_for(
+            lambda: [lastname for _, _, lastname in names.search("zwol", 10)]
+            == ["Zwolinska"]
+        )
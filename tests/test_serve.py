@@ -0,0 +1,27 @@
+import pytest
+
+from app.config import settings
+from app.serve import pool_limits
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    monkeypatch.setattr(settings, "pool_size", 5)
+    monkeypatch.setattr(settings, "max_overflow", 10)
+    monkeypatch.setattr(settings, "read_database_url", None)
+    monkeypatch.setattr(settings, "live_notify", False)
+    monkeypatch.setattr(settings, "anomaly_detection", False)
+
+
+def test_dedicated_connections_come_out_of_each_workers_share(monkeypatch):
+    assert pool_limits(40, 4) == (5, 5)
+    monkeypatch.setattr(settings, "live_notify", True)
+    assert pool_limits(40, 4) == (5, 4)
+    monkeypatch.setattr(settings, "anomaly_detection", True)
+    assert pool_limits(40, 4) == (5, 3)
+
+
+def test_workers_that_do_not_fit_are_refused(monkeypatch):
+    monkeypatch.setattr(settings, "anomaly_detection", True)
+    with pytest.raises(SystemExit):
+        pool_limits(4, 4)
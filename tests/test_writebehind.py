@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.writebehind import ScoreWriter
+
+
+@pytest.fixture
+def entry(fetch) -> dict:
+    """Values of an existing score entry, to write copies of."""
+    (row,) = fetch(
+        "SELECT student_id, judge_id, lesson_id, amount, score_type::text,"
+        " event_id FROM score_entries ORDER BY id LIMIT 1"
+    )
+    return dict(row)
+
+
+@pytest.fixture
+def written(fetch):
+    """Ids and amounts of score entries whose amount lies in [low, high)."""
+
+    def written(low: int, high: int) -> dict[int, int]:
+        return dict(
+            fetch(
+                "SELECT id, amount FROM score_entries WHERE amount >= $1 AND amount < $2",
+                low,
+                high,
+            )
+        )
+
+    return written
+
+
+def test_concurrent_submits_get_their_own_rows(monkeypatch, run, entry, written):
+    monkeypatch.setattr(settings, "score_write_behind", "commit")
+    monkeypatch.setattr(settings, "score_batch_flushers", 2)
+    monkeypatch.setattr(settings, "score_batch_size", 16)
+    amounts = range(1_000_000, 1_000_100)
+
+    async def main():
+        writer = ScoreWriter()
+        rows = await asyncio.gather(
+            *(writer.submit({**entry, "amount": amount}) for amount in amounts)
+        )
+        await writer.stop()
+        return rows
+
+    rows = run(main())
+
+    assert [row.amount for row in rows] == list(amounts)
+    assert written(amounts.start, amounts.stop) == {row.id: row.amount for row in rows}
+
+
+def test_failed_batch_is_retried_row_by_row(monkeypatch, run, entry, written):
+    monkeypatch.setattr(settings, "score_write_behind", "commit")
+    monkeypatch.setattr(settings, "score_batch_flushers", 1)
+    monkeypatch.setattr(settings, "score_batch_delay", 0.05)
+    amounts = range(2_000_000, 2_000_010)
+    bad = amounts[3]
+
+    async def main():
+        writer = ScoreWriter()
+        results = await asyncio.gather(
+            *(
+                writer.submit(
+                    {**entry, "amount": amount}
+                    | ({"student_id": 2**31 - 1} if amount == bad else {})
+                )
+                for amount in amounts
+            ),
+            return_exceptions=True,
+        )
+        await writer.stop()
+        return results
+
+    results = run(main())
+
+    assert isinstance(results[3], IntegrityError)
+    assert sorted(written(amounts.start, amounts.stop).values()) == [
+        amount for amount in amounts if amount != bad
+    ]
+
+
+def test_stop_flushes_everything_queued(monkeypatch, run, entry, written):
+    monkeypatch.setattr(settings, "score_write_behind", "queued")
+    amounts = range(3_000_000, 3_000_050)
+
+    async def main():
+        writer = ScoreWriter()
+        results = [
+            await writer.submit({**entry, "amount": amount}) for amount in amounts
+        ]
+        queue = writer._queue
+        await writer.stop()
+        return results, queue
+
+    results, queue = run(main())
+
+    assert results == [None] * len(amounts)
+    assert queue.empty()
+    assert sorted(written(amounts.start, amounts.stop).values()) == list(amounts)